@@ -0,0 +1 @@
+# Lets pytest import the phases package when run from the repository root.
@@ -3,13 +3,14 @@ from tkinter import ttk, scrolledtext, messagebox
 import sys
 from io import StringIO
 
-from phases.intermediate import IntermediateCode
-from phases.lexical import LexicalAnalysis
-from phases.semantic import SemanticAnalysis
-from phases.syntax import SyntaxAnalysis
-from phases.optimizer import Optimizer
+from phases.lexical import LexicalAnalysis, TOKENS
+from phases.visitor import walk
+from phases.optimizer import Optimizer, format_pass_stats
 from phases.codegen import CodeGenerator
 from phases.interpreter import Interpreter
+from phases.instrument import Instrumentation, count_nodes
+from phases.diagnostics import format_diagnostics
+from phases.incremental import IncrementalCompiler
 
 
 class CompilerGUI:
@@ -19,36 +20,10 @@ class CompilerGUI:
         self.root.geometry("1400x900")
         self.root.configure(bg='#2b2b2b')
         
-        self.tokens = [
-            ("KEYWORD",    r'\b(string|int|array|for|while|if|else|return|in)\b'),
-            ("COUT",       r'\bcout\b'),
-            ("SHL",        r'<<'),
-            ("EQ",         r'=='),
-            ("NEQ",        r'!='),
-            ("LE",         r'<='),
-            ("GE",         r'>='),
-            ("ASSIGN",     r'='),
-            ("LT",         r'<'),
-            ("GT",         r'>'),
-            ("PLUS",       r'\+'),
-            ("MINUS",      r'-'),
-            ("MUL",        r'\*'),
-            ("DIV",        r'/'),
-            ("LPAREN",     r'\('),
-            ("RPAREN",     r'\)'),
-            ("LBRACE",     r'\{'),
-            ("RBRACE",     r'\}'),
-            ("LBRACKET",   r'\['),
-            ("RBRACKET",   r'\]'),
-            ("COLON",      r':'),
-            ("SEMICOLON",  r';'),
-            ("COMMA",      r','),
-            ("STRING_LITERAL", r'"[^"\n]*"'),
-            ("NUMBER",     r'\b\d+\b'),
-            ("IDENTIFIER", r'\b[a-zA-Z_][a-zA-Z_0-9]*\b'),
-            ("COMMENT",    r'//[^\n]*'),
-            ("WHITESPACE", r'[ \t\n]+'),
-        ]
+        self.tokens = TOKENS
+        # Keeps the last compile's results so the next one only redoes the
+        # statements that were edited.
+        self.incremental = IncrementalCompiler(LexicalAnalysis(self.tokens))
         
         self.setup_ui()
         self.load_sample_code()
@@ -110,6 +85,14 @@ class CompilerGUI:
         sample_dropdown.current(0)
         sample_dropdown.bind('<<ComboboxSelected>>', lambda e: self.load_sample_code())
         
+        # Memory tracing slows every phase down several times over, so the
+        # Performance tab only reports peak memory when asked to.
+        self.trace_memory_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(button_frame, text="Trace memory", variable=self.trace_memory_var,
+                       font=('Arial', 10), bg='#2b2b2b', fg='#ffffff',
+                       selectcolor='#2b2b2b', activebackground='#2b2b2b',
+                       activeforeground='#ffffff').pack(side=tk.LEFT, padx=(20, 5))
+        
         self.notebook = ttk.Notebook(main_container)
         self.notebook.pack(fill=tk.BOTH, expand=True)
         
@@ -128,6 +111,7 @@ class CompilerGUI:
         self.create_phase_tab("Optimized Code", "optimized")
         self.create_phase_tab("Generated Code", "generated")
         self.create_phase_tab("Execution Output", "output")
+        self.create_phase_tab("Performance", "performance")
         
         self.status_bar = tk.Label(self.root, text="Ready", 
                                    font=('Arial', 9), bg='#404040', 
@@ -217,7 +201,7 @@ cout << diff;'''
         self.code_input.delete(1.0, tk.END)
         
         for phase in ['tokens', 'syntax', 'semantic', 'intermediate', 
-                     'optimized', 'generated', 'output']:
+                     'optimized', 'generated', 'output', 'performance']:
             text_widget = getattr(self, f"{phase}_text")
             text_widget.config(state=tk.NORMAL)
             text_widget.delete(1.0, tk.END)
@@ -247,61 +231,91 @@ cout << diff;'''
         self.compile_btn.config(state=tk.DISABLED)
         self.root.update()
         
+        instrument = Instrumentation(trace_memory=self.trace_memory_var.get())
+        
         try:
             self.update_status("Phase 1: Lexical Analysis...", "yellow")
-            lex = LexicalAnalysis(self.tokens)
-            tokens = lex.lexer(code)
+            with instrument.phase("lex") as record:
+                tokens = self.incremental.lex(code)
+                record.items["tokens"] = len(tokens)
+                record.items["relexed"] = self.incremental.stats["relexed"]
             
             tokens_output = "TOKENS:\n" + "="*50 + "\n"
-            for i, (token_type, value) in enumerate(tokens, 1):
-                tokens_output += f"{i:3}. {token_type:20} : {value}\n"
+            for i, token in enumerate(tokens, 1):
+                tokens_output += f"{i:3}. {token.type:20} : {token.value}  ({token.line}:{token.column})\n"
             tokens_output += f"\nTotal Tokens: {len(tokens)}"
             self.update_text(self.tokens_text, tokens_output)
             
             self.update_status("Phase 2: Syntax Analysis...", "yellow")
-            syn = SyntaxAnalysis(tokens)
-            syntax_tree = syn.parse_program()
+            with instrument.phase("parse") as record:
+                syntax_tree = self.incremental.parse()
+                syntax_errors = self.incremental.syntax_errors
+                record.items["nodes"] = count_nodes(syntax_tree)
+                record.items["reparsed"] = self.incremental.stats["reparsed"]
             
             syntax_output = "ABSTRACT SYNTAX TREE:\n" + "="*50 + "\n"
             syntax_output += self.format_ast(syntax_tree)
+            if syntax_errors:
+                syntax_output += f"\n✗ {len(syntax_errors)} syntax error(s):\n" + format_diagnostics(syntax_errors)
+                self.update_text(self.syntax_text, syntax_output)
+                raise SyntaxError(format_diagnostics(syntax_errors))
             syntax_output += "\n✓ Syntax tree built successfully!"
             self.update_text(self.syntax_text, syntax_output)
             
             self.update_status("Phase 3: Semantic Analysis...", "yellow")
-            sem = SemanticAnalysis()
-            sem.analyze(syntax_tree)
+            with instrument.phase("analyze") as record:
+                symbol_table = self.incremental.analyze()
+                semantic_errors = self.incremental.semantic_errors
+                record.items["symbols"] = len(symbol_table)
+                record.items["reanalyzed"] = self.incremental.stats["reanalyzed"]
+            
+            if semantic_errors:
+                semantic_output = "SEMANTIC ANALYSIS:\n" + "="*50 + "\n"
+                semantic_output += f"✗ {len(semantic_errors)} semantic error(s):\n" + format_diagnostics(semantic_errors)
+                self.update_text(self.semantic_text, semantic_output)
+                raise Exception(format_diagnostics(semantic_errors))
             
             semantic_output = "SEMANTIC ANALYSIS:\n" + "="*50 + "\n"
             semantic_output += "✓ No semantic errors found!\n\n"
             semantic_output += "SYMBOL TABLE:\n" + "-"*50 + "\n"
-            for var, var_type in sem.symbol_table.items():
+            for var, var_type in symbol_table.items():
                 semantic_output += f"{var:20} : {var_type}\n"
             self.update_text(self.semantic_text, semantic_output)
             
             self.update_status("Phase 4: Intermediate Code Generation...", "yellow")
-            ic = IntermediateCode()
-            ic.generate(syntax_tree)
+            with instrument.phase("generate") as record:
+                intermediate_code = self.incremental.generate()
+                record.items["instructions"] = len(intermediate_code)
+                record.items["regenerated"] = self.incremental.stats["regenerated"]
             
             intermediate_output = "INTERMEDIATE CODE:\n" + "="*50 + "\n"
-            for i, instruction in enumerate(ic.get_code(), 1):
+            for i, instruction in enumerate(intermediate_code, 1):
                 intermediate_output += f"{i:3}. {instruction}\n"
             self.update_text(self.intermediate_text, intermediate_output)
             
             self.update_status("Phase 5: Code Optimization...", "yellow")
-            optimizer = Optimizer(ic.get_code())
-            optimized_code = optimizer.optimize()
+            with instrument.phase("optimize") as record:
+                optimizer = Optimizer(intermediate_code)
+                optimized_code = optimizer.optimize()
+                record.items["instructions"] = len(optimized_code)
+                record.items["iterations"] = optimizer.iterations
             
             optimized_output = "OPTIMIZED CODE:\n" + "="*50 + "\n"
-            optimized_output += f"Original: {len(ic.get_code())} instructions\n"
+            optimized_output += f"Original: {len(intermediate_code)} instructions\n"
             optimized_output += f"Optimized: {len(optimized_code)} instructions\n"
-            optimized_output += f"Reduction: {len(ic.get_code()) - len(optimized_code)} instructions\n\n"
+            optimized_output += f"Reduction: {len(intermediate_code) - len(optimized_code)} instructions\n\n"
+            for line in format_pass_stats(optimizer.stats.values()):
+                optimized_output += f"{line}\n"
+            optimized_output += "\n"
             for i, instruction in enumerate(optimized_code, 1):
                 optimized_output += f"{i:3}. {instruction}\n"
             self.update_text(self.optimized_text, optimized_output)
             
             self.update_status("Phase 6: Code Generation...", "yellow")
-            codegen = CodeGenerator(optimized_code)
-            python_code = codegen.generate()
+            with instrument.phase("codegen") as record:
+                codegen = CodeGenerator(optimized_code)
+                python_code = codegen.generate()
+                record.items["lines"] = python_code.count("\n") + 1
             
             generated_output = "GENERATED PYTHON CODE:\n" + "="*50 + "\n"
             generated_output += python_code
@@ -314,7 +328,9 @@ cout << diff;'''
             sys.stdout = captured_output = StringIO()
             
             try:
-                interpreter.execute()
+                with instrument.phase("execute") as record:
+                    interpreter.execute()
+                    record.items["instructions"] = interpreter.steps
                 execution_output = captured_output.getvalue()
             finally:
                 sys.stdout = old_stdout
@@ -323,6 +339,10 @@ cout << diff;'''
             output_text += execution_output
             self.update_text(self.output_text, output_text)
             
+            performance_output = "PHASE PERFORMANCE:\n" + "="*50 + "\n"
+            performance_output += instrument.report()
+            self.update_text(self.performance_text, performance_output)
+            
             self.update_status("✓ Compilation Successful!", "green")
             messagebox.showinfo("Success", "Compilation completed successfully!")
             
@@ -344,35 +364,16 @@ cout << diff;'''
                 self.update_text(text_widget, error_text)
         
         finally:
+            instrument.close()
             self.compile_btn.config(state=tk.NORMAL)
     
-    def format_ast(self, node, indent=0):
-        output = ""
-        indent_str = "  " * indent
-        
-        node_type = type(node).__name__
-        output += f"{indent_str}├─ {node_type}\n"
-        
-        if hasattr(node, 'statements'):
-            for stmt in node.statements:
-                output += self.format_ast(stmt, indent + 1)
-        elif hasattr(node, 'name'):
-            output += f"{indent_str}  └─ name: {node.name}\n"
-            if hasattr(node, 'expression'):
-                output += f"{indent_str}  └─ expression:\n"
-                output += self.format_ast(node.expression, indent + 2)
-        elif hasattr(node, 'value'):
-            output += f"{indent_str}  └─ value: {node.value}\n"
-        elif hasattr(node, 'elements'):
-            output += f"{indent_str}  └─ elements:\n"
-            for elem in node.elements:
-                output += self.format_ast(elem, indent + 2)
-        elif hasattr(node, 'body'):
-            output += f"{indent_str}  └─ body:\n"
-            for stmt in node.body:
-                output += self.format_ast(stmt, indent + 2)
-        
-        return output
+    def format_ast(self, node):
+        lines = []
+        for child, depth in walk(node):
+            indent_str = "  " * depth
+            lines.append(f"{indent_str}├─ {type(child).__name__}")
+            lines.extend(f"{indent_str}  └─ {field}: {value}" for field, value in child.values())
+        return "\n".join(lines) + "\n"
 
 
 def main():
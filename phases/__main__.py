@@ -0,0 +1,114 @@
+import argparse
+import json
+import sys
+
+from .batch import collect_sources, compile_files, failures
+from .cache import open_cache
+from .instrument import Instrumentation
+from .optimizer import DEFAULT_LEVEL, OPTIMIZATION_LEVELS, format_pass_stats
+from .pipeline import BACKENDS, compile_source
+from .profiler import format_profile
+
+EMIT_CHOICES = ("tokens", "ir", "optimized", "python", "run")
+
+
+def render(result, emit):
+    if emit == "tokens":
+        return "".join(f"{t.line}:{t.column} {t.type} {t.value}\n" for t in result.tokens)
+    if emit == "ir":
+        return "".join(f"{instruction}\n" for instruction in result.intermediate)
+    if emit == "optimized":
+        return "".join(f"{instruction}\n" for instruction in result.optimized)
+    if emit == "python":
+        return result.python_code.lstrip("\n") + "\n"
+    return result.output
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m phases",
+                                     description="Compile and run StarrLang programs without the GUI.")
+    parser.add_argument("files", nargs="*", default=["-"],
+                        help="source files or directories of .starr files (nothing or '-' reads stdin)")
+    parser.add_argument("--emit", choices=EMIT_CHOICES, default="run",
+                        help="what to print for each file (default: run the program)")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="compile files in N worker processes (0 = one per CPU)")
+    parser.add_argument("--cache", metavar="DIR", nargs="?", const="",
+                        help="reuse optimized IR and generated Python from an on-disk cache "
+                             "(default directory: $STARR_CACHE_DIR or ~/.cache/starrlang)")
+    parser.add_argument("--backend", choices=BACKENDS, default="interpreter",
+                        help="how to run programs: the IR interpreter, the generated Python compiled "
+                             "in-process (falls back to the interpreter on failure), or closures "
+                             "compiled from the syntax tree")
+    parser.add_argument("-O", dest="opt_level", type=int, choices=sorted(OPTIMIZATION_LEVELS), default=DEFAULT_LEVEL,
+                        help=f"optimization level: 0 = none, 1 = one sweep of every pass, "
+                             f"2 = repeat the passes to a fixpoint (default: {DEFAULT_LEVEL})")
+    parser.add_argument("--stats", action="store_true",
+                        help="report wall time, CPU time, peak memory and item counts per phase, "
+                             "and per-pass optimizer statistics, on stderr")
+    parser.add_argument("--profile", action="store_true",
+                        help="profile execution per instruction, source line and loop, reported on stderr "
+                             "(always uses the interpreter)")
+    parser.add_argument("--profile-json", metavar="FILE",
+                        help="also write the execution profiles as JSON")
+    args = parser.parse_args(argv)
+    profile = args.emit == "run" and (args.profile or args.profile_json is not None)
+
+    generate = args.emit == "python"
+    run = args.emit == "run"
+    paths = collect_sources(args.files)
+
+    # Cache entries only hold the optimized IR and the generated Python.
+    cache_dir = None
+    if args.cache is not None and args.emit in ("optimized", "python", "run"):
+        cache_dir = open_cache(args.cache or None).directory
+
+    if paths == ["-"]:
+        cache = open_cache(cache_dir) if cache_dir else None
+        instrument = Instrumentation() if args.stats else None
+        results = [compile_source(sys.stdin.read(), "<stdin>", generate=generate, run=run, cache=cache,
+                                  backend=args.backend, instrument=instrument, profile=profile,
+                                  opt_level=args.opt_level, keep_tokens=args.emit == "tokens")]
+        if instrument is not None:
+            instrument.close()
+    else:
+        results = compile_files(paths, jobs=args.jobs or None, generate=generate, run=run, cache_dir=cache_dir,
+                                backend=args.backend, stats=args.stats, profile=profile, opt_level=args.opt_level,
+                                emit=args.emit)
+
+    for result in results:
+        if args.stats:
+            print(f"{result.name}: phases", file=sys.stderr)
+            for record in result.phases:
+                print(f"  {record}", file=sys.stderr)
+            for line in format_pass_stats(result.passes):
+                print(f"  {line}", file=sys.stderr)
+
+        if not result.ok:
+            for error in result.error.splitlines():
+                print(f"{result.name}: error: {error}", file=sys.stderr)
+            continue
+
+        if result.fallback is not None:
+            print(f"{result.name}: warning: generated Python raised {result.fallback}; "
+                  f"output is from the interpreter", file=sys.stderr)
+
+        if len(paths) > 1:
+            print(f"==> {result.name} <==")
+        sys.stdout.write(render(result, args.emit))
+
+        if args.profile and result.profile is not None:
+            print(f"{result.name}: profile", file=sys.stderr)
+            print(format_profile(result.profile, result.source), file=sys.stderr)
+
+    if args.profile_json and profile:
+        with open(args.profile_json, "w", encoding="utf-8") as f:
+            json.dump({result.name: result.profile for result in results if result.profile is not None},
+                      f, indent=2)
+            f.write("\n")
+
+    return 1 if failures(results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
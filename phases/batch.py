@@ -0,0 +1,79 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from .cache import open_cache
+from .instrument import Instrumentation
+from .optimizer import DEFAULT_LEVEL
+from .pipeline import Compilation, compile_source
+
+SOURCE_SUFFIX = ".starr"
+
+# The intermediate result each way of emitting a file prints.  A worker drops
+# the others before its result is pickled back to the parent: for a
+# typical file the token list and the IR are each larger than the syntax
+# tree, and all of them far outweigh the output itself.
+EMITTED_FIELDS = {"tokens": "tokens", "ir": "intermediate", "optimized": "optimized"}
+INTERMEDIATE_FIELDS = ("tokens", "tree", "intermediate", "optimized")
+
+
+def collect_sources(paths):
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            found = []
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in files:
+                    if name.endswith(SOURCE_SUFFIX):
+                        found.append(os.path.join(root, name))
+            sources.extend(sorted(found))
+        else:
+            sources.append(path)
+    return sources
+
+
+def compile_file(path, generate=True, run=False, cache_dir=None, backend="interpreter", stats=False,
+                 profile=False, opt_level=DEFAULT_LEVEL, emit="run"):
+    try:
+        with open(path, encoding="utf-8") as f:
+            source = f.read()
+    except OSError as e:
+        result = Compilation("", path)
+        result.error = f"{type(e).__name__}: {e.strerror}"
+        return result
+
+    cache = open_cache(cache_dir) if cache_dir else None
+    instrument = Instrumentation() if stats else None
+    try:
+        result = compile_source(source, path, generate=generate, run=run, cache=cache, backend=backend,
+                                instrument=instrument, profile=profile, opt_level=opt_level,
+                                keep_tokens=emit == "tokens")
+    finally:
+        if instrument is not None:
+            instrument.close()
+    for field in INTERMEDIATE_FIELDS:
+        if field != EMITTED_FIELDS.get(emit):
+            setattr(result, field, None)
+    return result
+
+
+def compile_files(paths, jobs=None, generate=True, run=False, cache_dir=None, backend="interpreter",
+                  stats=False, profile=False, opt_level=DEFAULT_LEVEL, emit="run"):
+    paths = list(paths)
+    jobs = jobs or os.cpu_count() or 1
+
+    if jobs == 1 or len(paths) <= 1:
+        return [compile_file(path, generate, run, cache_dir, backend, stats, profile, opt_level, emit)
+                for path in paths]
+
+    chunksize = max(1, len(paths) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(compile_file, paths,
+                             [generate] * len(paths), [run] * len(paths),
+                             [cache_dir] * len(paths), [backend] * len(paths), [stats] * len(paths),
+                             [profile] * len(paths), [opt_level] * len(paths), [emit] * len(paths),
+                             chunksize=chunksize))
+
+
+def failures(results):
+    return [result for result in results if not result.ok]
@@ -0,0 +1,190 @@
+import argparse
+import io
+import json
+import platform
+import sys
+from contextlib import redirect_stdout
+
+from .cache import compiler_version
+from .instrument import Instrumentation
+from .optimizer import DEFAULT_LEVEL, OPTIMIZATION_LEVELS
+from .pipeline import BACKENDS, compile_source
+
+PHASES = ("lex", "parse", "analyze", "generate", "optimize", "codegen", "execute")
+
+# Phases faster than this are dominated by timer noise and never reported as
+# regressions.
+NOISE_FLOOR = 0.001
+
+
+def while_counter(n):
+    return (f"int i = 0;\nint total = 0;\n"
+            f"while (i < {n}) {{\n    total = total + i;\n    i = i + 1;\n}}\n"
+            f"cout << total;\n")
+
+
+def array_literal(n):
+    elements = ", ".join(f'"item{i}"' for i in range(n))
+    return f"array items = {{{elements}}};\nint count = size(items);\ncout << count;\n"
+
+
+def nested_for(n):
+    elements = ", ".join(f'"{i}"' for i in range(n))
+    return (f"array rows = {{{elements}}};\narray columns = {{{elements}}};\nint cells = 0;\n"
+            f"for (row in rows) {{\n    for (column in columns) {{\n        cells = cells + 1;\n    }}\n}}\n"
+            f"cout << cells;\n")
+
+
+def string_concat(n):
+    return (f'string text = "";\nint i = 0;\n'
+            f'while (i < {n}) {{\n    text = text + "ab";\n    i = i + 1;\n}}\n'
+            f"int total = length(text);\ncout << total;\n")
+
+
+def arithmetic(n):
+    return (f"int i = 0;\nint total = 0;\n"
+            f"while (i < {n}) {{\n    int a = i * 3;\n"
+            f"    total = total + (a + 1) * (a + 1) + (a + 1) * 0;\n    i = i + 1;\n}}\n"
+            f"cout << total;\n")
+
+
+def long_program(n):
+    lines = ["int x0 = 1;"]
+    lines.extend(f"int x{i} = x{i - 1} + {i};" for i in range(1, n))
+    lines.append(f"cout << x{n - 1};")
+    return "\n".join(lines) + "\n"
+
+
+# name -> (source builder, size at scale 1.0)
+WORKLOADS = {
+    "while_counter": (while_counter, 100000),
+    "array_literal": (array_literal, 5000),
+    "nested_for": (nested_for, 200),
+    "string_concat": (string_concat, 20000),
+    "arithmetic": (arithmetic, 50000),
+    "long_program": (long_program, 2000),
+}
+
+
+def run_phases(source, backend="interpreter", opt_level=DEFAULT_LEVEL):
+    instrument = Instrumentation(trace_memory=False)
+    # The execute phase prints the program's own output.
+    with redirect_stdout(io.StringIO()):
+        result = compile_source(source, "<benchmark>", generate=True, run=True, backend=backend,
+                                instrument=instrument, opt_level=opt_level)
+    if not result.ok:
+        raise Exception(result.error)
+    return {record.name: record.wall for record in instrument.records}
+
+
+def benchmark(workloads=None, repeat=3, scale=1.0, backend="interpreter", opt_level=DEFAULT_LEVEL):
+    results = {}
+    for name in workloads or WORKLOADS:
+        build, size = WORKLOADS[name]
+        source = build(max(1, int(size * scale)))
+
+        # Keep the best time per phase; slower runs only add scheduler noise.
+        best = {}
+        for _ in range(repeat):
+            for phase, seconds in run_phases(source, backend, opt_level).items():
+                best[phase] = min(seconds, best.get(phase, seconds))
+        best["total"] = sum(best[phase] for phase in PHASES)
+        results[name] = best
+
+    return {
+        "compiler": compiler_version(),
+        "python": platform.python_version(),
+        "backend": backend,
+        "opt_level": opt_level,
+        "repeat": repeat,
+        "scale": scale,
+        "workloads": results,
+    }
+
+
+def compare(current, baseline, threshold=0.10):
+    regressions = []
+    for name, phases in current["workloads"].items():
+        previous = baseline.get("workloads", {}).get(name)
+        if previous is None:
+            continue
+        for phase, seconds in phases.items():
+            before = previous.get(phase)
+            if not before or phase == "total":
+                continue
+            ratio = seconds / before
+            if ratio > 1 + threshold and seconds - before > NOISE_FLOOR:
+                regressions.append((name, phase, before, seconds, ratio))
+    return regressions
+
+
+def format_results(current, baseline=None):
+    columns = PHASES + ("total",)
+    lines = [f"{'workload':<16}" + "".join(f"{phase:>11}" for phase in columns)]
+    for name, phases in current["workloads"].items():
+        lines.append(f"{name:<16}" + "".join(f"{phases[phase] * 1000:>9.2f}ms" for phase in columns))
+        previous = (baseline or {}).get("workloads", {}).get(name)
+        if previous:
+            cells = []
+            for phase in columns:
+                before = previous.get(phase)
+                cells.append(f"{phases[phase] / before:>10.2f}x" if before else f"{'-':>11}")
+            lines.append(f"{'  vs baseline':<16}" + "".join(cells))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m phases.benchmark",
+                                     description="Time each compiler phase on synthetic StarrLang workloads.")
+    parser.add_argument("workloads", nargs="*",
+                        help=f"workloads to run (default: all of {', '.join(WORKLOADS)})")
+    parser.add_argument("-n", "--repeat", type=int, default=3,
+                        help="runs per workload; the fastest time of each phase is kept")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="multiply every workload's size by this factor")
+    parser.add_argument("--backend", choices=BACKENDS, default="interpreter",
+                        help="engine timed by the execute phase")
+    parser.add_argument("-O", dest="opt_level", type=int, choices=sorted(OPTIMIZATION_LEVELS), default=DEFAULT_LEVEL,
+                        help=f"optimization level used for every workload (default: {DEFAULT_LEVEL})")
+    parser.add_argument("-o", "--output", metavar="FILE",
+                        help="write the results as JSON")
+    parser.add_argument("--baseline", metavar="FILE",
+                        help="compare against results previously written with --output")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="slowdown ratio above which a phase counts as regressed (default: 0.10)")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.workloads if name not in WORKLOADS]
+    if unknown:
+        parser.error(f"unknown workload: {', '.join(unknown)}")
+
+    current = benchmark(args.workloads, repeat=max(1, args.repeat), scale=args.scale, backend=args.backend,
+                        opt_level=args.opt_level)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        for setting in ("backend", "scale", "opt_level"):
+            if baseline.get(setting) != current[setting]:
+                print(f"warning: baseline was recorded with {setting}={baseline.get(setting)}, "
+                      f"not {current[setting]}", file=sys.stderr)
+
+    print(format_results(current, baseline))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    if baseline is None:
+        return 0
+
+    regressions = compare(current, baseline, args.threshold)
+    for name, phase, before, seconds, ratio in regressions:
+        print(f"regression: {name} {phase} {before * 1000:.2f}ms -> {seconds * 1000:.2f}ms ({ratio:.2f}x)",
+              file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+import hashlib
+import os
+import pickle
+import tempfile
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+ENTRY_SUFFIX = ".pickle"
+
+compiler_digest = None
+open_caches = {}
+
+
+def compiler_version():
+    # Any change to the compiler's own sources invalidates every entry.
+    global compiler_digest
+    if compiler_digest is None:
+        digest = hashlib.sha256()
+        package_dir = os.path.dirname(os.path.abspath(__file__))
+        for name in sorted(os.listdir(package_dir)):
+            if name.endswith(".py"):
+                with open(os.path.join(package_dir, name), "rb") as f:
+                    digest.update(name.encode())
+                    digest.update(f.read())
+        compiler_digest = digest.hexdigest()[:16]
+    return compiler_digest
+
+
+def default_cache_dir():
+    return os.environ.get("STARR_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "starrlang")
+
+
+def open_cache(directory=None, max_bytes=DEFAULT_MAX_BYTES):
+    directory = os.path.abspath(directory or default_cache_dir())
+    cache = open_caches.get(directory)
+    if cache is None:
+        cache = CompilationCache(directory, max_bytes)
+        open_caches[directory] = cache
+    return cache
+
+
+class CompilationCache():
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.size = None
+
+    def key(self, source, options=""):
+        digest = hashlib.sha256()
+        digest.update(compiler_version().encode())
+        digest.update(b"\0")
+        digest.update(options.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(source.encode("utf-8"))
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key + ENTRY_SUFFIX)
+
+    def get(self, source, options=""):
+        path = self.path(self.key(source, options))
+        try:
+            with open(path, "rb") as f:
+                entry = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            self.discard(path)
+            return None
+
+        # Entries are evicted oldest-mtime first, so a hit refreshes it.
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def put(self, source, optimized, python_code, options=""):
+        path = self.path(self.key(source, options))
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+
+        data = pickle.dumps((optimized, python_code), protocol=pickle.HIGHEST_PROTOCOL)
+        # Overwriting an entry only grows the cache by the difference.
+        try:
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = 0
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            self.discard(temp_path)
+            raise
+
+        if self.size is None:
+            self.size = self.disk_usage()
+        else:
+            self.size += len(data) - replaced
+        if self.size > self.max_bytes:
+            self.evict()
+
+    def entries(self):
+        for root, dirs, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(ENTRY_SUFFIX):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield stat.st_mtime, stat.st_size, path
+
+    def disk_usage(self):
+        return sum(size for mtime, size, path in self.entries())
+
+    def evict(self):
+        entries = sorted(self.entries())
+        total = sum(size for mtime, size, path in entries)
+        # Trim below the limit so eviction does not run on every put.
+        target = self.max_bytes * 0.9
+        for mtime, size, path in entries:
+            if total <= target:
+                break
+            self.discard(path)
+            total -= size
+        self.size = total
+
+    def discard(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,307 @@
+from collections import deque
+
+from .ir import Var, LABEL, ASSIGN
+
+
+class BasicBlock():
+    __slots__ = ('index', 'start', 'instructions', 'successors', 'predecessors')
+
+    def __init__(self, index, start, instructions):
+        self.index = index
+        self.start = start
+        self.instructions = instructions
+        self.successors = []
+        self.predecessors = []
+
+    def label(self):
+        first = self.instructions[0] if self.instructions else None
+        return first.target if first is not None and first.opcode == LABEL else None
+
+
+class ControlFlowGraph():
+
+    def __init__(self, code):
+        self.code = code
+        self.blocks = []
+        self.label_blocks = {}
+        self.definitions = {}
+        self.build()
+
+    def build(self):
+        leaders = {0}
+        for i, instruction in enumerate(self.code):
+            if instruction.opcode == LABEL:
+                leaders.add(i)
+            elif instruction.is_jump():
+                leaders.add(i + 1)
+
+        starts = sorted(i for i in leaders if i < len(self.code))
+        for n, start in enumerate(starts):
+            end = starts[n + 1] if n + 1 < len(starts) else len(self.code)
+            block = BasicBlock(n, start, self.code[start:end])
+            self.blocks.append(block)
+            label = block.label()
+            if label is not None:
+                self.label_blocks[label] = n
+
+        for block in self.blocks:
+            last = block.instructions[-1]
+            fallthrough = block.index + 1 if block.index + 1 < len(self.blocks) else None
+            targets = []
+            if last.is_jump() and last.target in self.label_blocks:
+                targets.append(self.label_blocks[last.target])
+                if last.is_conditional() and fallthrough is not None:
+                    targets.append(fallthrough)
+            elif fallthrough is not None:
+                # Jumps to unknown labels fall through, as in the interpreter.
+                targets.append(fallthrough)
+
+            for target in targets:
+                if target not in block.successors:
+                    block.successors.append(target)
+                    self.blocks[target].predecessors.append(block.index)
+
+    def reachable(self):
+        if not self.blocks:
+            return set()
+        seen = {0}
+        queue = deque([0])
+        while queue:
+            for successor in self.blocks[queue.popleft()].successors:
+                if successor not in seen:
+                    seen.add(successor)
+                    queue.append(successor)
+        return seen
+
+    def dominators(self):
+        # Only reachable blocks get dominator sets; the rest map to None.
+        reachable = self.reachable()
+        order = sorted(reachable)
+        dominators = [None] * len(self.blocks)
+        for b in order:
+            dominators[b] = set(order)
+        if order:
+            dominators[0] = {0}
+
+        changed = True
+        while changed:
+            changed = False
+            for b in order[1:]:
+                incoming = None
+                for predecessor in self.blocks[b].predecessors:
+                    if dominators[predecessor] is None:
+                        continue
+                    incoming = set(dominators[predecessor]) if incoming is None else incoming & dominators[predecessor]
+                new = (incoming or set()) | {b}
+                if new != dominators[b]:
+                    dominators[b] = new
+                    changed = True
+        return dominators
+
+    def natural_loops(self):
+        # Maps each loop header to the blocks of its natural loop; back
+        # edges sharing a header are merged into one loop.
+        dominators = self.dominators()
+        loops = {}
+        for block in self.blocks:
+            if dominators[block.index] is None:
+                continue
+            for header in block.successors:
+                if header not in dominators[block.index]:
+                    continue
+                body = loops.setdefault(header, {header})
+                stack = [block.index]
+                while stack:
+                    b = stack.pop()
+                    if b not in body:
+                        body.add(b)
+                        stack.extend(self.blocks[b].predecessors)
+        return loops
+
+    def liveness(self):
+        uses = []
+        defs = []
+        for block in self.blocks:
+            block_uses = set()
+            block_defs = set()
+            for instruction in block.instructions:
+                block_uses.update(v for v in instruction.uses() if v not in block_defs)
+                if instruction.dest is not None:
+                    block_defs.add(instruction.dest)
+            uses.append(block_uses)
+            defs.append(block_defs)
+
+        live_in = [set() for _ in self.blocks]
+        live_out = [set() for _ in self.blocks]
+        worklist = deque(reversed(range(len(self.blocks))))
+        queued = set(worklist)
+        while worklist:
+            b = worklist.popleft()
+            queued.discard(b)
+            out = set()
+            for successor in self.blocks[b].successors:
+                out |= live_in[successor]
+            live_out[b] = out
+            new_in = uses[b] | (out - defs[b])
+            if new_in != live_in[b]:
+                live_in[b] = new_in
+                for predecessor in self.blocks[b].predecessors:
+                    if predecessor not in queued:
+                        queued.add(predecessor)
+                        worklist.append(predecessor)
+        return live_in, live_out
+
+    def reaching_definitions(self):
+        # Definition ids are instruction positions; every variable also gets
+        # an entry pseudo-definition standing for "not assigned yet".
+        self.definitions = {}
+        var_defs = {}
+        for i, instruction in enumerate(self.code):
+            if instruction.dest is not None:
+                self.definitions[i] = (instruction.dest, instruction)
+                var_defs.setdefault(instruction.dest, set()).add(i)
+
+        entry = set()
+        for name in list(var_defs):
+            pseudo = len(self.code) + len(entry)
+            self.definitions[pseudo] = (name, None)
+            var_defs[name].add(pseudo)
+            entry.add(pseudo)
+
+        gen = []
+        kill = []
+        for block in self.blocks:
+            block_gen = {}
+            for offset, instruction in enumerate(block.instructions):
+                if instruction.dest is not None:
+                    block_gen[instruction.dest] = block.start + offset
+            gen.append(set(block_gen.values()))
+            killed = set()
+            for name in block_gen:
+                killed |= var_defs[name]
+            kill.append(killed - gen[-1])
+
+        reach_in = [set() for _ in self.blocks]
+        reach_out = [set(g) for g in gen]
+        if self.blocks:
+            reach_in[0] = set(entry)
+            reach_out[0] = gen[0] | (entry - kill[0])
+        worklist = deque(range(len(self.blocks)))
+        queued = set(worklist)
+        while worklist:
+            b = worklist.popleft()
+            queued.discard(b)
+            incoming = set(entry) if b == 0 else set()
+            for predecessor in self.blocks[b].predecessors:
+                incoming |= reach_out[predecessor]
+            reach_in[b] = incoming
+            new_out = gen[b] | (incoming - kill[b])
+            if new_out != reach_out[b]:
+                reach_out[b] = new_out
+                for successor in self.blocks[b].successors:
+                    if successor not in queued:
+                        queued.add(successor)
+                        worklist.append(successor)
+        return reach_in
+
+    def available_copies(self):
+        all_copies = set()
+        gen = []
+        killed_vars = []
+        for block in self.blocks:
+            available = {}
+            defined = set()
+            for instruction in block.instructions:
+                dest = instruction.dest
+                if dest is None:
+                    continue
+                defined.add(dest)
+                available = {d: s for d, s in available.items() if d != dest and s != dest}
+                if instruction.opcode == ASSIGN and type(instruction.operands[0]) is Var:
+                    source = instruction.operands[0].name
+                    if source != dest:
+                        available[dest] = source
+            copies = set(available.items())
+            all_copies |= copies
+            gen.append(copies)
+            killed_vars.append(defined)
+
+        def transfer(b, incoming):
+            defined = killed_vars[b]
+            return gen[b] | {c for c in incoming if c[0] not in defined and c[1] not in defined}
+
+        copies_in = [set() for _ in self.blocks]
+        copies_out = [set(all_copies) for _ in self.blocks]
+        worklist = deque(range(len(self.blocks)))
+        queued = set(worklist)
+        while worklist:
+            b = worklist.popleft()
+            queued.discard(b)
+            predecessors = self.blocks[b].predecessors
+            if b == 0 or not predecessors:
+                incoming = set()
+            else:
+                incoming = set(copies_out[predecessors[0]])
+                for predecessor in predecessors[1:]:
+                    incoming &= copies_out[predecessor]
+            copies_in[b] = incoming
+            new_out = transfer(b, incoming)
+            if new_out != copies_out[b]:
+                copies_out[b] = new_out
+                for successor in self.blocks[b].successors:
+                    if successor not in queued:
+                        queued.add(successor)
+                        worklist.append(successor)
+        return copies_in
+
+    def available_expressions(self):
+        # Facts are (expression, variable) pairs: the variable still holds
+        # the value of the expression, none of whose operands have changed.
+        all_facts = set()
+        gen = []
+        killed_vars = []
+        for block in self.blocks:
+            available = {}
+            defined = set()
+            for instruction in block.instructions:
+                dest = instruction.dest
+                if dest is None:
+                    continue
+                defined.add(dest)
+                available = {e: v for e, v in available.items() if v != dest and Var(dest) not in e[2]}
+                expression = instruction.expression()
+                if expression is not None and Var(dest) not in expression[2]:
+                    available[expression] = dest
+            facts = set(available.items())
+            all_facts |= facts
+            gen.append(facts)
+            killed_vars.append(defined)
+
+        def transfer(b, incoming):
+            defined = killed_vars[b]
+            return gen[b] | {f for f in incoming if f[1] not in defined
+                             and defined.isdisjoint(o.name for o in f[0][2] if type(o) is Var)}
+
+        expressions_in = [set() for _ in self.blocks]
+        expressions_out = [set(all_facts) for _ in self.blocks]
+        worklist = deque(range(len(self.blocks)))
+        queued = set(worklist)
+        while worklist:
+            b = worklist.popleft()
+            queued.discard(b)
+            predecessors = self.blocks[b].predecessors
+            if b == 0 or not predecessors:
+                incoming = set()
+            else:
+                incoming = set(expressions_out[predecessors[0]])
+                for predecessor in predecessors[1:]:
+                    incoming &= expressions_out[predecessor]
+            expressions_in[b] = incoming
+            new_out = transfer(b, incoming)
+            if new_out != expressions_out[b]:
+                expressions_out[b] = new_out
+                for successor in self.blocks[b].successors:
+                    if successor not in queued:
+                        queued.add(successor)
+                        worklist.append(successor)
+        return expressions_in
@@ -0,0 +1,218 @@
+import operator
+
+from .syntax import IntLiteral, StringLiteral
+from .visitor import NodeVisitor, operator_chain
+
+
+def add(left, right):
+    if type(left) is type(right) and (type(left) is int or type(left) is str):
+        return left + right
+    return str(left) + str(right)
+
+
+def subtract(left, right):
+    return left - right if type(left) is int and type(right) is int else 0
+
+
+def multiply(left, right):
+    return left * right if type(left) is int and type(right) is int else 0
+
+
+def divide(left, right):
+    return left // right if type(left) is int and type(right) is int and right != 0 else 0
+
+
+def index(value, position):
+    if value is not None and isinstance(position, int) and 0 <= position < len(value):
+        return value[position]
+    return None
+
+
+def slice_(value, start, stop):
+    if value is not None and isinstance(start, int) and isinstance(stop, int):
+        if 0 <= start < len(value):
+            return value[start:stop + 1]
+    return None
+
+
+def length(value):
+    return len(value) if value is not None else 0
+
+
+BINARY_OPERATIONS = {
+    '+': add, '-': subtract, '*': multiply, '/': divide,
+    '<': operator.lt, '>': operator.gt, '<=': operator.le, '>=': operator.ge,
+    '==': operator.eq, '!=': operator.ne,
+}
+
+
+class ClosureCompiler(NodeVisitor):
+    prefix = "compile_"
+
+    def __init__(self, tree):
+        self.tree = tree
+        self.slots = {}
+        self.program = None
+        self.frame = []
+        self.variables = {}
+
+    def execute(self):
+        print("\n=== Executing Program (closures) ===")
+        print("Output:")
+        print("-" * 30)
+
+        self.compile()
+        self.run()
+
+        print("-" * 30)
+        print("Program execution complete!")
+        print("=" * 30)
+
+    def slot(self, name):
+        if name not in self.slots:
+            self.slots[name] = len(self.slots)
+        return self.slots[name]
+
+    def compile(self):
+        # Every node is turned into a closure exactly once; running the
+        # program is then a single call with a fresh frame of variable slots.
+        self.program = self.compile_node(self.tree)
+        return self.program
+
+    compile_node = NodeVisitor.visit
+
+    def compile_block(self, statements):
+        compiled = tuple(self.compile_node(stmt) for stmt in statements)
+        if len(compiled) == 1:
+            return compiled[0]
+
+        def block(frame):
+            for statement in compiled:
+                statement(frame)
+        return block
+
+    def compile_Program(self, node):
+        return self.compile_block(node.statements)
+
+    def compile_store(self, name, expression):
+        slot = self.slot(name)
+        value = self.compile_node(expression)
+
+        def store(frame):
+            frame[slot] = value(frame)
+        return store
+
+    def compile_Declaration(self, node):
+        return self.compile_store(node.name, node.expression)
+
+    def compile_Assignment(self, node):
+        return self.compile_store(node.name, node.expression)
+
+    def compile_Print(self, node):
+        value = self.compile_node(node.printable)
+
+        def print_(frame):
+            print(value(frame))
+        return print_
+
+    def compile_Identifier(self, node):
+        slot = self.slot(node.name)
+        return lambda frame: frame[slot]
+
+    def compile_StringLiteral(self, node):
+        value = node.value[1:-1]
+        return lambda frame: value
+
+    def compile_IntLiteral(self, node):
+        value = node.value
+        return lambda frame: value
+
+    def compile_ArrayLiteral(self, node):
+        elements = tuple(self.compile_node(elem) for elem in node.elements)
+        return lambda frame: [element(frame) for element in elements]
+
+    def compile_SliceExpr(self, node):
+        slot = self.slot(node.name)
+        start = self.compile_node(node.start)
+        stop = self.compile_node(node.end)
+        return lambda frame: slice_(frame[slot], start(frame), stop(frame))
+
+    def compile_ArrayAccess(self, node):
+        slot = self.slot(node.name)
+        position = self.compile_node(node.index)
+        return lambda frame: index(frame[slot], position(frame))
+
+    def compile_FunctionCall(self, node):
+        if node.name in ("length", "size"):
+            argument = self.compile_node(node.arguments[0])
+            return lambda frame: length(argument(frame))
+        return lambda frame: None
+
+    def compile_BinaryOp(self, node):
+        operand, chain = operator_chain(node)
+        if len(chain) > 1:
+            return self.compile_chain(operand, chain)
+        
+        operation = BINARY_OPERATIONS[node.operator]
+        left = self.compile_node(node.left)
+
+        # Literal right-hand sides, as in `i < 10` or `i + 1`, are bound
+        # into the closure instead of being called for on every evaluation.
+        if isinstance(node.right, (IntLiteral, StringLiteral)):
+            constant = self.compile_node(node.right)(None)
+            return lambda frame: operation(left(frame), constant)
+
+        right = self.compile_node(node.right)
+        return lambda frame: operation(left(frame), right(frame))
+
+    def compile_chain(self, operand, chain):
+        # A flat chain like a + b + c + ... becomes one closure that folds
+        # its operands in a loop, so neither compiling nor running it nests
+        # a call per operator.
+        first = self.compile_node(operand)
+        steps = tuple((BINARY_OPERATIONS[binary.operator], self.compile_node(binary.right)) for binary in chain)
+
+        def chain_(frame):
+            value = first(frame)
+            for operation, right in steps:
+                value = operation(value, right(frame))
+            return value
+        return chain_
+
+    def compile_WhileLoop(self, node):
+        condition = self.compile_node(node.condition)
+        body = self.compile_block(node.body)
+
+        def while_loop(frame):
+            while condition(frame):
+                body(frame)
+        return while_loop
+
+    def compile_ForEachLoop(self, node):
+        iterable_slot = self.slot(node.iterable)
+        var_slot = self.slot(node.var)
+        body = self.compile_block(node.body)
+
+        def for_loop(frame):
+            iterable = frame[iterable_slot]
+            if iterable is None:
+                return
+            for item in iterable:
+                frame[var_slot] = item
+                body(frame)
+        return for_loop
+
+    def run(self):
+        if self.program is None:
+            self.compile()
+
+        frame = [None] * len(self.slots)
+        self.frame = frame
+        self.program(frame)
+        self.variables = {name: frame[slot] for name, slot in self.slots.items() if frame[slot] is not None}
+
+    def print_variables(self):
+        print("\n=== Variable State ===")
+        for var, value in self.variables.items():
+            print(f"{var} = {value}")
+        print("=" * 25)
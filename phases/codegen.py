@@ -1,3 +1,51 @@
+import json
+import keyword
+
+from .cfg import ControlFlowGraph
+from .ir import Instruction, Var, is_temp, LABEL, GOTO, IF, IFFALSE, PRINT, ASSIGN, BINOP, CALL, INDEX, SLICE, ARRAY
+
+# The language's bounds-checked element access and slicing.  They follow the
+# interpreter's rules rather than Python's, e.g. a negative index gives None,
+# and are written at the top of every program that uses them so the
+# generated code runs on its own.
+RUNTIME_HELPERS = {
+    "index": """def index(value, position):
+    if value is not None and isinstance(position, int) and 0 <= position < len(value):
+        return value[position]
+    return None
+""",
+    "slice": """def slice(value, start, stop):
+    if value is not None and isinstance(start, int) and isinstance(stop, int):
+        if 0 <= start < len(value):
+            return value[start:stop + 1]
+    return None
+""",
+}
+
+# Names the generated code calls: Python builtins and the helpers above.
+RUNTIME_NAMES = ("print", "len", "iter", "next", "isinstance", "int") + tuple(RUNTIME_HELPERS)
+
+# Python binding strength of the arithmetic operators.  Comparisons chain in
+# Python, so a nested comparison is always parenthesized.
+PRECEDENCE = {'*': 2, '/': 2, '+': 1, '-': 1}
+
+# Folded expressions nest at most this deep; CPython's compiler recurses
+# once per level, so deeper ones are split through their temporaries.
+MAX_FOLD_DEPTH = 100
+
+
+def python_name(name):
+    # Appending '_' to reserved names and to names already ending in '_'
+    # keeps the mapping one-to-one.
+    if keyword.iskeyword(name) or name in RUNTIME_NAMES or name.endswith('_'):
+        return name + '_'
+    return name
+
+
+class UnstructuredCode(Exception):
+    pass
+
+
 class CodeGenerator():
 
     def __init__(self, optimized_code):
@@ -5,103 +53,39 @@ class CodeGenerator():
         self.python_code = []
         self.indent_level = 0
         self.temp_values = {}
-        self.processed_indices = set()
+        self.use_counts = {}
+        self.jump_counts = {}
+        self.label_positions = {}
+        self.back_edges = {}
+        self.helpers = set()
 
     def generate(self):
-        print("\n=== Generating Python Code ===")
-        
-        self.emit("")
-        
-        self.collect_temp_values()
-        
-        i = 0
-        while i < len(self.intermediate_code):
-            if i in self.processed_indices:
-                i += 1
-                continue
-                
-            instruction = self.intermediate_code[i].strip()
-            
-            if instruction.endswith(':'):
-                if self.is_for_loop_start(i):
-                    end_idx = self.handle_for_loop(i - 1)
-                    for j in range(i - 1, end_idx + 1):
-                        self.processed_indices.add(j)
-                    i = end_idx
-                elif self.is_while_loop_start(i):
-                    end_idx = self.handle_while_loop(i)
-                    for j in range(i, end_idx + 1):
-                        self.processed_indices.add(j)
-                    i = end_idx
-                else:
-                    self.handle_label(instruction, i)
-            elif instruction.startswith('if '):
-                pass
-            elif instruction.startswith('goto '):
-                pass
-            elif instruction.startswith('print '):
-                self.handle_print(instruction)
-            elif '= iterator(' in instruction:
-                pass
-            elif '=' in instruction and not self.is_temp_assignment(instruction):
-                self.handle_assignment(instruction)
-            
-            i += 1
-        
-        print("Python code generation complete!")
-        print("=" * 30)
-        return '\n'.join(self.python_code)
-
-    def collect_temp_values(self):
-        for instruction in self.intermediate_code:
-            instruction = instruction.strip()
-            if '=' in instruction and not instruction.endswith(':'):
-                parts = instruction.split('=', 1)
-                lhs = parts[0].strip()
-                rhs = parts[1].strip()
-                
-                lhs_tokens = lhs.split()
-                var_name = lhs_tokens[-1] if lhs_tokens else lhs
-                
-                if var_name.startswith('t') and len(var_name) > 1 and var_name[1:].isdigit():
-                    self.temp_values[var_name] = rhs
-
-    def is_temp_assignment(self, instruction):
-        if '=' not in instruction:
-            return False
-        parts = instruction.split('=', 1)
-        lhs = parts[0].strip()
-        lhs_tokens = lhs.split()
-        var_name = lhs_tokens[-1] if lhs_tokens else lhs
-        return var_name.startswith('t') and len(var_name) > 1 and var_name[1:].isdigit()
-
-    def is_for_loop_start(self, index):
-        if index <= 0 or index >= len(self.intermediate_code):
-            return False
-        
-        prev_instruction = self.intermediate_code[index - 1].strip()
-        if '= iterator(' in prev_instruction:
-            return True
-        return False
+        self.analyze()
+        
+        try:
+            self.emit("")
+            self.emit_range(0, len(self.intermediate_code))
+        except UnstructuredCode:
+            self.python_code = []
+            self.indent_level = 0
+            self.temp_values = {}
+            self.emit("")
+            self.emit_dispatch()
+        
+        return self.get_code()
 
-    def is_while_loop_start(self, index):
-        if index >= len(self.intermediate_code):
-            return False
-        
-        instruction = self.intermediate_code[index].strip()
-        if not instruction.endswith(':'):
-            return False
-        
-        if index + 1 < len(self.intermediate_code):
-            next_instruction = self.intermediate_code[index + 1].strip()
-            if next_instruction.startswith('if ') and 'has_next' not in next_instruction:
-                label_name = instruction[:-1]
-                for j in range(index + 1, min(index + 30, len(self.intermediate_code))):
-                    line = self.intermediate_code[j].strip()
-                    if line == f"goto {label_name}":
-                        return True
-        
-        return False
+    def analyze(self):
+        # Everything the emitter needs to recognise loops is gathered in one
+        # pass, so emission itself never has to scan ahead.
+        for i, instruction in enumerate(self.intermediate_code):
+            if instruction.opcode == LABEL:
+                self.label_positions[instruction.target] = i
+            elif instruction.is_jump():
+                self.jump_counts[instruction.target] = self.jump_counts.get(instruction.target, 0) + 1
+                self.back_edges[instruction.target] = i
+            for name in instruction.uses():
+                if is_temp(name):
+                    self.use_counts[name] = self.use_counts.get(name, 0) + 1
 
     def emit(self, code):
         if code:
@@ -109,217 +93,362 @@ class CodeGenerator():
         else:
             self.python_code.append('')
 
-    def handle_assignment(self, instruction):
-        parts = instruction.split('=', 1)
-        lhs = parts[0].strip()
-        rhs = parts[1].strip()
-        
-        lhs_tokens = lhs.split()
-        var_name = lhs_tokens[-1] if lhs_tokens else lhs
-        
-        python_rhs = self.convert_expression(rhs, inline_temps=True)
-        
-        self.emit(f"{var_name} = {python_rhs}")
+    def emit_range(self, start, end):
+        code = self.intermediate_code
+        i = start
+        while i < end:
+            instruction = code[i]
+            opcode = instruction.opcode
+            
+            if opcode == LABEL:
+                i = self.emit_loop(i, end)
+            elif opcode == CALL and instruction.op == 'iterator':
+                i = self.emit_for_loop(i, end)
+            elif opcode == GOTO:
+                if not self.falls_through(i):
+                    raise UnstructuredCode(str(instruction))
+                i += 1
+            elif instruction.is_conditional():
+                i = self.emit_if(i, end)
+            elif opcode == PRINT:
+                self.handle_print(instruction)
+                i += 1
+            else:
+                if instruction.dest is not None:
+                    self.handle_assignment(instruction)
+                i += 1
 
-    def handle_print(self, instruction):
-        expr = instruction.split('print ', 1)[1].strip()
-        python_expr = self.convert_expression(expr, inline_temps=True)
-        self.emit(f"print({python_expr})")
+    def falls_through(self, index):
+        position = self.label_positions.get(self.intermediate_code[index].target)
+        if position is None:
+            return True
+        if position <= index:
+            return False
+        return all(line.opcode == LABEL for line in self.intermediate_code[index + 1:position])
 
-    def handle_label(self, instruction, index):
-        label = instruction[:-1]
-        if not self.is_for_loop_start(index) and not self.is_while_loop_start(index):
-            pass
+    def back_edge(self, label, start, end):
+        # A loop label must only be reached by its own back edge, and the
+        # loop must close inside the range being emitted.
+        back_edge = self.back_edges.get(label)
+        if back_edge is None or not start < back_edge < end or self.jump_counts.get(label) != 1:
+            return None
+        return back_edge
 
-    def handle_for_loop(self, start_index):
-        i = start_index
-        iterator_line = self.intermediate_code[i].strip()
-        
-        iterable = iterator_line.split('iterator(')[1].split(')')[0]
-        
-        loop_var = None
-        body_start = -1
-        body_end = -1
-        
-        for j in range(i, len(self.intermediate_code)):
-            line = self.intermediate_code[j].strip()
-            if 'next(' in line and '=' in line:
-                parts = line.split('=', 1)
-                lhs = parts[0].strip()
-                loop_var = lhs.split()[-1]
-                body_start = j + 1
-                break
-        
-        if body_start != -1:
-            for j in range(body_start, len(self.intermediate_code)):
-                line = self.intermediate_code[j].strip()
-                if line.startswith('goto ') and not line.endswith(':'):
-                    body_end = j - 1
-                    break
+    def single_entry_label(self, index, label):
+        # True when label sits at index and exactly one jump targets it.
+        line = self.intermediate_code[index] if index < len(self.intermediate_code) else None
+        return (line is not None and line.opcode == LABEL and line.target == label
+                and self.jump_counts.get(label) == 1)
+
+    def emit_loop(self, index, end):
+        code = self.intermediate_code
+        self.flush_temps()
+        
+        back_edge = self.back_edge(code[index].target, index, end)
+        if back_edge is None:
+            return index + 1
+        
+        if code[back_edge].is_conditional():
+            return self.emit_do_while(index, back_edge)
+        
+        j = index + 1
+        while j < back_edge and self.is_temp_assignment(code[j]) and not code[j].has_side_effects():
+            j += 1
+        test = code[j]
+        
+        if (test.opcode == IF and test.op is None and code[j + 1].opcode == GOTO
+                and self.single_entry_label(j + 2, test.target)
+                and self.single_entry_label(back_edge + 1, code[j + 1].target)):
+            # Lh: H; if c goto Lb; goto Le; Lb: body; goto Lh; Le:
+            body_start = j + 3
+        elif test.opcode == IFFALSE and test.op is None and self.single_entry_label(back_edge + 1, test.target):
+            # Lh: H; ifFalse c goto Le; body; goto Lh; Le:
+            body_start = j + 1
+        else:
+            # No recognisable exit test: the loop only ends by falling off
+            # a test inside its body, which cannot happen here.
+            self.emit("while True:")
+            self.indent_level += 1
+            self.emit_body(index + 1, back_edge)
+            return back_edge + 1
+        
+        header = code[index + 1:j]
+        if all(self.use_counts.get(line.dest) == 1 for line in header):
+            for line in header:
+                self.handle_assignment(line)
+            self.emit(f"while {self.convert_operand(test.operands[0], nested=False)}:")
+            self.indent_level += 1
+        else:
+            self.emit("while True:")
+            self.indent_level += 1
+            for line in header:
+                self.handle_assignment(line)
+            self.emit(f"if not {self.convert_operand(test.operands[0])}:")
+            self.emit("    break")
+        
+        self.emit_body(body_start, back_edge)
+        return back_edge + 2
+
+    def emit_do_while(self, index, back_edge):
+        # L: body; if c goto L  runs the body once before testing.
+        test = self.intermediate_code[back_edge]
+        if test.op is not None:
+            raise UnstructuredCode(str(test))
         
-        self.emit(f"for {loop_var} in {iterable}:")
+        self.emit("while True:")
         self.indent_level += 1
-        
-        if body_start != -1 and body_end != -1:
-            for j in range(body_start, body_end + 1):
-                body_line = self.intermediate_code[j].strip()
-                if body_line and not body_line.endswith(':') and not body_line.startswith('goto'):
-                    if body_line.startswith('print '):
-                        self.handle_print(body_line)
-                    elif '=' in body_line and not self.is_temp_assignment(body_line):
-                        self.handle_assignment(body_line)
-        
+        self.emit_range(index + 1, back_edge)
+        exit_test = self.convert_operand(test.operands[0])
+        self.flush_temps()
+        self.emit(f"if {'not ' if test.opcode == IF else ''}{exit_test}:")
+        self.emit("    break")
         self.indent_level -= 1
-        
-        for j in range(body_end + 1, len(self.intermediate_code)):
-            line = self.intermediate_code[j].strip()
-            if line.endswith(':'):
-                return j
-        
-        return body_end + 3
+        return back_edge + 1
 
-    def handle_while_loop(self, start_index):
-        i = start_index
-        
-        if i + 1 < len(self.intermediate_code):
-            condition_line = self.intermediate_code[i + 1].strip()
-            
-            if condition_line.startswith('if '):
-                condition_parts = condition_line.split('goto')
-                condition_expr = condition_parts[0].replace('if', '').strip()
-                
-                python_condition = self.convert_expression(condition_expr, inline_temps=True)
-                
-                body_start = i + 4
-                body_end = -1
-                
-                label_name = self.intermediate_code[i].strip()[:-1]
-                for j in range(body_start, len(self.intermediate_code)):
-                    line = self.intermediate_code[j].strip()
-                    if line == f"goto {label_name}":
-                        body_end = j - 1
-                        break
-                
-                self.emit(f"while {python_condition}:")
-                self.indent_level += 1
-                
-                if body_start != -1 and body_end != -1:
-                    for j in range(body_start, body_end + 1):
-                        body_line = self.intermediate_code[j].strip()
-                        if body_line and not body_line.endswith(':') and not body_line.startswith('goto'):
-                            if body_line.startswith('print '):
-                                self.handle_print(body_line)
-                            elif '=' in body_line and not self.is_temp_assignment(body_line):
-                                self.handle_assignment(body_line)
-                
-                self.indent_level -= 1
-                
-                for j in range(body_end + 1, len(self.intermediate_code)):
-                    line = self.intermediate_code[j].strip()
-                    if line.endswith(':'):
-                        return j
-                
-                return body_end + 2
-        
-        return i
+    def emit_if(self, index, end):
+        code = self.intermediate_code
+        test = code[index]
+        position = self.label_positions.get(test.target)
+        if test.op is not None or position is None or not index < position < end \
+                or self.jump_counts.get(test.target) != 1:
+            raise UnstructuredCode(str(test))
+        
+        # ifFalse c goto Le; Lb: body; if c goto Lb; Le:  is a rotated while
+        # loop guarded by its first test.
+        if test.opcode == IFFALSE and code[index + 1].opcode == LABEL:
+            back_edge = self.back_edge(code[index + 1].target, index + 1, end)
+            if back_edge is not None and back_edge + 1 == position:
+                closing = code[back_edge]
+                if closing.opcode == IF and closing.op is None and closing.operands == test.operands:
+                    self.emit(f"while {self.convert_operand(test.operands[0], nested=False)}:")
+                    self.indent_level += 1
+                    self.emit_body(index + 2, back_edge)
+                    return position
+        
+        python_condition = self.convert_operand(test.operands[0], nested=test.opcode == IF)
+        self.flush_temps()
+        self.emit(f"if {'not ' if test.opcode == IF else ''}{python_condition}:")
+        self.indent_level += 1
+        self.emit_body(index + 1, position)
+        return position
 
-    def convert_expression(self, expr, inline_temps=False):
-        expr = expr.strip()
-        
-        if inline_temps:
-            expr = self.inline_temps(expr)
-        
-        if expr.startswith('"') and expr.endswith('"'):
-            return expr
-        
-        if expr.isdigit() or (expr.startswith('-') and expr[1:].isdigit()):
-            return expr
+    def emit_for_loop(self, index, end):
+        code = self.intermediate_code
+        iterator = code[index]
+        cursor = Var(iterator.dest)
+        self.flush_temps()
+        
+        def line(offset):
+            return code[index + offset] if index + offset < len(code) else Instruction(LABEL)
+        
+        if line(1).opcode == LABEL and line(2).opcode == IF:
+            # Lh: if has_next goto Lb; goto Le; Lb: x = next; body; goto Lh; Le:
+            test, fetch, body_start = line(2), line(5), index + 6
+            back_edge = self.back_edge(line(1).target, index + 1, end)
+            exit_label = None
+            if line(3).opcode == GOTO and self.single_entry_label(index + 4, test.target):
+                exit_label = line(3).target
+            closing = GOTO
+        elif line(1).opcode == LABEL and line(2).opcode == IFFALSE:
+            # Lh: ifFalse has_next goto Le; x = next; body; goto Lh; Le:
+            test, fetch, body_start = line(2), line(3), index + 4
+            back_edge = self.back_edge(line(1).target, index + 1, end)
+            exit_label = test.target
+            closing = GOTO
+        elif line(1).opcode == IFFALSE and line(2).opcode == LABEL:
+            # ifFalse has_next goto Le; Lb: x = next; body; if has_next goto Lb; Le:
+            test, fetch, body_start = line(1), line(3), index + 4
+            back_edge = self.back_edge(line(2).target, index + 2, end)
+            exit_label = test.target
+            closing = IF
+        else:
+            raise UnstructuredCode(str(iterator))
         
-        if expr.startswith('{') and expr.endswith('}'):
-            return '[' + expr[1:-1] + ']'
+        if (back_edge is None or exit_label is None or test.op != 'has_next' or test.operands[0] != cursor
+                or code[back_edge].opcode != closing or not self.single_entry_label(back_edge + 1, exit_label)
+                or fetch.opcode != CALL or fetch.op != 'next' or fetch.operands[0] != cursor
+                or self.use_counts.get(iterator.dest) != (3 if closing == IF else 2)):
+            raise UnstructuredCode(str(iterator))
         
-        if '[' in expr and ']' in expr:
-            parts = expr.split('[', 1)
-            var_name = parts[0]
-            index_part = parts[1].rsplit(']', 1)[0]
+        iterable = self.convert_operand(iterator.operands[0], nested=False)
+        self.emit(f"for {python_name(fetch.dest)} in {iterable}:")
+        self.indent_level += 1
+        self.emit_body(body_start, back_edge)
+        return back_edge + 2
+
+    def emit_body(self, start, end):
+        length = len(self.python_code)
+        self.emit_range(start, end)
+        self.flush_temps()
+        if len(self.python_code) == length:
+            self.emit("pass")
+        self.indent_level -= 1
+
+    def emit_dispatch(self):
+        # Control flow the structured emitter does not recognise becomes a
+        # loop over basic blocks; block_ cannot collide with user names.
+        cfg = ControlFlowGraph(self.intermediate_code)
+        if not cfg.blocks:
+            return
+        
+        self.emit("block_ = 0")
+        self.emit("while True:")
+        self.indent_level += 1
+        for block in cfg.blocks:
+            self.emit(f"{'if' if block.index == 0 else 'elif'} block_ == {block.index}:")
+            self.indent_level += 1
+            
+            for instruction in block.instructions:
+                if instruction.opcode == PRINT:
+                    self.handle_print(instruction)
+                elif instruction.opcode == CALL and instruction.op == 'iterator':
+                    iterable = self.convert_operand(instruction.operands[0], nested=False)
+                    self.materialize(instruction.dest)
+                    self.emit(f"{python_name(instruction.dest)} = [{iterable}, 0]")
+                elif instruction.opcode == CALL and instruction.op == 'next':
+                    cursor = self.convert_operand(instruction.operands[0])
+                    self.materialize(instruction.dest)
+                    self.emit(f"{python_name(instruction.dest)} = {cursor}[0][{cursor}[1]]")
+                    self.emit(f"{cursor}[1] += 1")
+                elif instruction.dest is not None:
+                    self.handle_assignment(instruction)
             
-            if ':' in index_part:
-                colon_parts = index_part.split(':', 1)
-                start_str = colon_parts[0]
-                end_str = colon_parts[1]
-                start = self.convert_expression(start_str.strip(), inline_temps)
-                end = self.convert_expression(end_str.strip(), inline_temps)
-                return f"{var_name}[{start}:{end}+1]"
+            last = block.instructions[-1]
+            fallthrough = block.index + 1 if block.index + 1 < len(cfg.blocks) else -1
+            if last.is_jump() and last.target in cfg.label_blocks:
+                target = cfg.label_blocks[last.target]
+                if last.opcode == GOTO:
+                    self.flush_temps()
+                    self.emit(f"block_ = {target}")
+                else:
+                    if last.op == 'has_next':
+                        cursor = self.convert_operand(last.operands[0])
+                        condition = f"{cursor}[1] < len({cursor}[0])"
+                    else:
+                        condition = self.convert_operand(last.operands[0])
+                    if last.opcode == IFFALSE:
+                        condition = f"not ({condition})"
+                    self.flush_temps()
+                    self.emit(f"block_ = {target} if {condition} else {fallthrough}")
             else:
-                index = self.convert_expression(index_part, inline_temps)
-                return f"{var_name}[{index}]"
-        
-        for op in ['<=', '>=', '==', '!=', '<', '>']:
-            if f' {op} ' in expr:
-                parts = expr.split(f' {op} ', 1)
-                left = self.convert_expression(parts[0].strip(), inline_temps)
-                right = self.convert_expression(parts[1].strip(), inline_temps)
-                return f"{left} {op} {right}"
-        
-        if ' + ' in expr:
-            parts = expr.split(' + ', 1)
-            left = self.convert_expression(parts[0].strip(), inline_temps)
-            right = self.convert_expression(parts[1].strip(), inline_temps)
-            return f"{left} + {right}"
+                self.flush_temps()
+                self.emit(f"block_ = {fallthrough}")
+            self.indent_level -= 1
         
-        if ' - ' in expr:
-            parts = expr.split(' - ', 1)
-            left = self.convert_expression(parts[0].strip(), inline_temps)
-            right = self.convert_expression(parts[1].strip(), inline_temps)
-            return f"{left} - {right}"
-        
-        if ' * ' in expr:
-            parts = expr.split(' * ', 1)
-            left = self.convert_expression(parts[0].strip(), inline_temps)
-            right = self.convert_expression(parts[1].strip(), inline_temps)
-            return f"{left} * {right}"
+        self.emit("else:")
+        self.emit("    break")
+        self.indent_level -= 1
+
+    def is_temp_assignment(self, instruction):
+        return instruction.dest is not None and is_temp(instruction.dest)
+
+    def handle_assignment(self, instruction):
+        dest = instruction.dest
+        if is_temp(dest) and self.use_counts.get(dest) == 1 and not instruction.has_side_effects():
+            # Single-use temps are folded into the expression that reads them;
+            # deps records the variables the folded text depends on.
+            deps = set()
+            depth = 1
+            for operand in instruction.operands:
+                if type(operand) is Var:
+                    pending = self.temp_values.get(operand.name)
+                    deps |= pending[2] if pending else {operand.name}
+                    depth = max(depth, pending[3] + 1 if pending else 1)
+            if depth <= MAX_FOLD_DEPTH:
+                python_rhs = self.convert_expression(instruction)
+                op = instruction.op if instruction.opcode == BINOP else None
+                self.temp_values[dest] = (python_rhs, op, deps, depth)
+                return
+        
+        python_rhs = self.convert_expression(instruction)
+        self.materialize(dest)
+        self.emit(f"{python_name(dest)} = {python_rhs}")
+
+    def materialize(self, name):
+        # A pending expression that reads name has to be evaluated before
+        # name is overwritten.
+        for temp, (python_expr, _, deps, _) in list(self.temp_values.items()):
+            if name in deps or temp == name:
+                del self.temp_values[temp]
+                self.emit(f"{python_name(temp)} = {python_expr}")
+
+    def flush_temps(self):
+        for temp, (python_expr, _, _, _) in self.temp_values.items():
+            self.emit(f"{python_name(temp)} = {python_expr}")
+        self.temp_values = {}
+
+    def handle_print(self, instruction):
+        python_expr = self.convert_operand(instruction.operands[0], nested=False)
+        self.emit(f"print({python_expr})")
+
+    def convert_operand(self, operand, nested=True, parent=None, right=False):
+        if type(operand) is not Var:
+            if isinstance(operand.value, str):
+                return json.dumps(operand.value)
+            return repr(operand.value)
+        
+        pending = self.temp_values.pop(operand.name, None)
+        if pending is None:
+            return python_name(operand.name)
+        
+        python_expr, op, _, _ = pending
+        if nested and op is not None and self.needs_parentheses(op, parent, right):
+            return f"({python_expr})"
+        return python_expr
+
+    def needs_parentheses(self, op, parent, right):
+        # Only what Python's own precedence and left associativity require,
+        # so flat chains like a + b + c do not nest a parenthesis per operator.
+        if op not in PRECEDENCE or parent not in PRECEDENCE:
+            return True
+        if right:
+            return PRECEDENCE[op] <= PRECEDENCE[parent]
+        return PRECEDENCE[op] < PRECEDENCE[parent]
+
+    def convert_expression(self, instruction):
+        opcode = instruction.opcode
         
-        if ' / ' in expr:
-            parts = expr.split(' / ', 1)
-            left = self.convert_expression(parts[0].strip(), inline_temps)
-            right = self.convert_expression(parts[1].strip(), inline_temps)
-            return f"{left} // {right}"
+        if opcode == ASSIGN:
+            return self.convert_operand(instruction.operands[0], nested=False)
         
-        if expr.startswith('length('):
-            arg = expr.split('length(', 1)[1].rsplit(')', 1)[0]
-            return f"len({self.convert_expression(arg, inline_temps)})"
+        if opcode == BINOP:
+            left = self.convert_operand(instruction.operands[0], parent=instruction.op)
+            right = self.convert_operand(instruction.operands[1], parent=instruction.op, right=True)
+            op = '//' if instruction.op == '/' else instruction.op
+            return f"{left} {op} {right}"
         
-        if expr.startswith('size('):
-            arg = expr.split('size(', 1)[1].rsplit(')', 1)[0]
-            return f"len({self.convert_expression(arg, inline_temps)})"
+        operands = [self.convert_operand(o) for o in instruction.operands]
         
-        if 'iterator(' in expr or 'next(' in expr or 'has_next(' in expr:
-            return expr
+        if opcode == INDEX:
+            self.helpers.add("index")
+            return f"index({operands[0]}, {operands[1]})"
         
-        return expr
-
-    def inline_temps(self, expr):
-        import re
+        if opcode == SLICE:
+            self.helpers.add("slice")
+            return f"slice({operands[0]}, {operands[1]}, {operands[2]})"
         
-        sorted_temps = sorted(self.temp_values.items(), key=lambda x: len(x[0]), reverse=True)
+        if opcode == ARRAY:
+            return '[' + ', '.join(operands) + ']'
         
-        for temp_var, temp_value in sorted_temps:
-            if temp_var in expr:
-                pattern = r'\b' + re.escape(temp_var) + r'\b'
-                inlined_value = self.convert_expression(temp_value, inline_temps=False)
-                expr = re.sub(pattern, inlined_value, expr)
+        if opcode == CALL:
+            if instruction.op in ('length', 'size'):
+                return f"len({operands[0]})"
+            if instruction.op == 'iterator':
+                return f"iter({operands[0]})"
+            return f"{instruction.op}({operands[0]})"
         
-        return expr
+        return str(instruction)
 
     def save_to_file(self, filename="output.py"):
         with open(filename, 'w') as f:
-            f.write('\n'.join(self.python_code))
+            f.write(self.get_code())
         print(f"\nPython code saved to {filename}")
 
     def print_code(self):
         print("\n=== Generated Python Code ===")
-        print('\n'.join(self.python_code))
+        print(self.get_code())
         print("=" * 30)
 
     def get_code(self):
-        return '\n'.join(self.python_code)
\ No newline at end of file
+        helpers = [code for name, code in RUNTIME_HELPERS.items() if name in self.helpers]
+        return '\n'.join(helpers + self.python_code)
@@ -0,0 +1,18 @@
+class Diagnostic():
+    __slots__ = ('message', 'line', 'column')
+
+    def __init__(self, message, line=None, column=None):
+        self.message = message
+        self.line = line
+        self.column = column
+
+    def __str__(self):
+        if self.line is None:
+            return self.message
+        if self.column is None:
+            return f"line {self.line}: {self.message}"
+        return f"line {self.line}, column {self.column}: {self.message}"
+
+
+def format_diagnostics(diagnostics):
+    return "\n".join(str(diagnostic) for diagnostic in diagnostics)
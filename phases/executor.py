@@ -0,0 +1,48 @@
+import builtins
+import functools
+import io
+
+from .codegen import RUNTIME_HELPERS, RUNTIME_NAMES
+
+
+@functools.lru_cache(maxsize=256)
+def compile_python(python_code):
+    return compile(python_code, "<starrlang>", "exec")
+
+
+class PythonExecutor():
+
+    def __init__(self, python_code):
+        self.python_code = python_code
+        self.code_object = None
+        self.namespace = {}
+
+    def compile(self):
+        self.code_object = compile_python(self.python_code)
+        return self.code_object
+
+    def execute(self):
+        print("\n=== Executing Generated Python ===")
+        print("Output:")
+        print("-" * 30)
+
+        print(self.run(), end="")
+
+        print("-" * 30)
+        print("Program execution complete!")
+        print("=" * 30)
+
+    def run(self):
+        if self.code_object is None:
+            self.compile()
+
+        # Generated programs only see the handful of builtins codegen emits
+        # (the helpers they define themselves), and print writes into a
+        # buffer instead of the real stdout.
+        output = io.StringIO()
+        runtime = {name: getattr(builtins, name) for name in RUNTIME_NAMES if name not in RUNTIME_HELPERS}
+        runtime["print"] = functools.partial(print, file=output)
+        self.namespace = {"__builtins__": runtime}
+
+        exec(self.code_object, self.namespace)
+        return output.getvalue()
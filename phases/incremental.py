@@ -0,0 +1,327 @@
+from .lexical import Token, default_lexer
+from .syntax import SyntaxAnalysis, Program, Statement
+from .semantic import SemanticAnalysis
+from .intermediate import IntermediateCode
+from .diagnostics import Diagnostic
+from .ir import Var, is_temp
+
+MISSING = object()
+
+
+def first_token_at(tokens, offset, low=0):
+    # Index of the first token starting at or after offset.
+    high = len(tokens)
+    while low < high:
+        mid = (low + high) // 2
+        if tokens[mid].offset < offset:
+            low = mid + 1
+        else:
+            high = mid
+    return low
+
+
+def common_prefix(a, b):
+    # Binary search over slice comparisons keeps the character loop in C.
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[:mid] == b[:mid]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def common_suffix(a, b, limit):
+    low, high = 0, limit
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[len(a) - mid:] == b[len(b) - mid:]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def shift_tokens(tokens, offset, lines, columns):
+    if not (offset or lines or columns):
+        return tokens
+    # Only tokens on the first line share its change of column.  Building
+    # the tuples directly skips the namedtuple constructor's overhead.
+    first_line = tokens[0].line
+    new = tuple.__new__
+    return [new(Token, (t[0], t[1], t[2] + lines, t[3] + columns if t[2] == first_line else t[3], t[4] + offset))
+            for t in tokens]
+
+
+def renumber(code, temp_range, temp_shift, label_range, label_shift, line_shift):
+    # Moves a statement's IR to new temp and label numbers and source lines.
+    # Only the temps and labels the statement itself created are renamed.
+    def rename_temp(name):
+        if name is None or not is_temp(name) or int(name[1:]) not in temp_range:
+            return name
+        return f"t{int(name[1:]) + temp_shift}"
+
+    def rename_label(label):
+        if label is None or not label[1:].isdigit() or int(label[1:]) not in label_range:
+            return label
+        return f"L{int(label[1:]) + label_shift}"
+
+    renumbered = []
+    for instruction in code:
+        line = instruction.line + line_shift if instruction.line is not None else None
+        if not (temp_shift or label_shift):
+            renumbered.append(instruction.copy(line=line))
+            continue
+        operands = [Var(rename_temp(o.name)) if type(o) is Var else o for o in instruction.operands]
+        renumbered.append(instruction.copy(dest=rename_temp(instruction.dest), operands=operands,
+                                           target=rename_label(instruction.target), line=line))
+    return renumbered
+
+
+class SymbolTrace(dict):
+    # A symbol table that notes what the statement being analyzed read from
+    # it before writing, and what it wrote, so the statement's analysis can
+    # be replayed whenever those reads would see the same types again.
+
+    def start(self):
+        self.reads = {}
+        self.writes = []
+        self.written = set()
+
+    def note(self, name):
+        if name not in self.reads and name not in self.written:
+            self.reads[name] = dict.get(self, name, MISSING)
+
+    def __contains__(self, name):
+        self.note(name)
+        return dict.__contains__(self, name)
+
+    def __getitem__(self, name):
+        self.note(name)
+        return dict.__getitem__(self, name)
+
+    def __setitem__(self, name, value):
+        self.written.add(name)
+        self.writes.append((name, value))
+        dict.__setitem__(self, name, value)
+
+    def pop(self, name, *default):
+        self.written.add(name)
+        self.writes.append((name, MISSING))
+        return dict.pop(self, name, *default)
+
+    def matches(self, reads):
+        return all(dict.get(self, name, MISSING) == value for name, value in reads.items())
+
+    def replay(self, writes):
+        for name, value in writes:
+            if value is MISSING:
+                dict.pop(self, name, None)
+            else:
+                dict.__setitem__(self, name, value)
+
+
+class StatementEntry():
+    # A top-level statement, the token range it was parsed from, and the
+    # results of the later phases for it.
+    __slots__ = ('node', 'start', 'end', 'reads', 'writes', 'diagnostics', 'analyzed_line',
+                 'code', 'temp_base', 'label_base', 'temps', 'labels', 'code_line')
+
+    def __init__(self, node, start, end):
+        self.node = node
+        self.start = start
+        self.end = end
+        self.reads = None
+        self.writes = None
+        self.diagnostics = None
+        self.analyzed_line = None
+        self.code = None
+        self.temp_base = 0
+        self.label_base = 0
+        self.temps = 0
+        self.labels = 0
+        self.code_line = None
+
+
+class IncrementalCompiler():
+    # Compiles successive versions of one source, such as an editor buffer.
+    # Each phase reuses what the previous version left behind: only the
+    # edited lines are re-lexed, only the top-level statements whose tokens
+    # changed are re-parsed, and only those get fresh IR.  A statement is
+    # re-analyzed when it is new or when a symbol it looked up changed type.
+    # Call lex, parse, analyze and generate in order for each version.
+
+    def __init__(self, lexer=default_lexer):
+        self.lexer = lexer
+        self.source = ""
+        self.tokens = []
+        self.entries = []
+        self.tree = None
+        self.syntax_errors = []
+        self.symbol_table = {}
+        self.semantic_errors = []
+        self.code = []
+        self.front = 0
+        self.resume = 0
+        self.old_count = 0
+        self.token_shift = 0
+        self.line_shift = 0
+        self.stats = {}
+
+    def lex(self, source):
+        old, tokens = self.source, self.tokens
+        prefix = common_prefix(old, source)
+        suffix = common_suffix(old, source, min(len(old), len(source)) - prefix)
+        delta = len(source) - len(old)
+
+        # No token spans lines, so lexing restarts at the start of the first
+        # edited line and stops at the first token that starts in the
+        # unchanged tail where an identical old token started.
+        restart = source.rfind("\n", 0, prefix) + 1
+        front = first_token_at(tokens, restart)
+        tail = len(source) - suffix
+        fresh = []
+        resume = len(tokens)
+        shifted = []
+        self.line_shift = 0
+        for token in self.lexer.tokenize(source, restart, old.count("\n", 0, restart) + 1):
+            if token.offset >= tail:
+                i = first_token_at(tokens, token.offset - delta, front)
+                if i < len(tokens) and tokens[i].offset == token.offset - delta and tokens[i][:2] == token[:2]:
+                    resume = i
+                    self.line_shift = token.line - tokens[i].line
+                    shifted = shift_tokens(tokens[i:], delta, self.line_shift, token.column - tokens[i].column)
+                    break
+            fresh.append(token)
+
+        self.front = front
+        self.resume = resume
+        self.old_count = len(tokens)
+        self.token_shift = len(fresh) - (resume - front)
+        self.source = source
+        self.tokens = tokens[:front] + fresh + shifted
+        self.stats = {"relexed": len(fresh)}
+        return self.tokens
+
+    def parse(self):
+        # Reused statements must run unbroken from either end of the tokens;
+        # a stretch that failed to parse last time is parsed again.
+        before = []
+        for entry in self.entries:
+            if entry.start != (before[-1].end if before else 0) or entry.end > self.front:
+                break
+            before.append(entry)
+        after = []
+        for entry in reversed(self.entries[len(before):]):
+            if entry.end != (after[-1].start if after else self.old_count) or entry.start < self.resume:
+                break
+            after.append(entry)
+        after.reverse()
+        for entry in after:
+            entry.start += self.token_shift
+            entry.end += self.token_shift
+            if self.line_shift:
+                # Expressions carry no lines and never contain statements.
+                stack = [entry.node]
+                while stack:
+                    node = stack.pop()
+                    node.line += self.line_shift
+                    stack.extend(child for child in node.children() if isinstance(child, Statement))
+        self.entries = before + after
+
+        # Parse what lies between the reused statements.  A statement only
+        # looks at its own tokens, so if that stretch parses cleanly into
+        # whole statements the result is what a full parse would give.  An
+        # edit can also make a statement run on into the ones after it, so
+        # failing that, everything after the reused prefix is parsed.
+        start = before[-1].end if before else 0
+        middle = self.parse_range(start, after[0].start) if after else None
+        if middle is None:
+            after = []
+            middle = self.parse_range(start, len(self.tokens))
+        if middle is None:
+            # Parse everything with recovery to report every error.
+            parser = SyntaxAnalysis(self.tokens)
+            self.tree = parser.parse_program()
+            self.syntax_errors = parser.errors
+            self.stats["reparsed"] = len(self.tree.statements)
+            return self.tree
+
+        self.entries = before + middle + after
+        self.tree = Program([entry.node for entry in self.entries])
+        self.syntax_errors = []
+        self.stats["reparsed"] = len(middle)
+        return self.tree
+
+    def parse_range(self, start, end):
+        # The statements in tokens[start:end], or None unless they parse
+        # without errors.
+        parser = SyntaxAnalysis(self.tokens[start:end])
+        entries = []
+        try:
+            while parser.current():
+                begin = parser.pos
+                node = parser.parse_statement()
+                entries.append(StatementEntry(node, start + begin, start + parser.pos))
+        except SyntaxError:
+            return None
+        return None if parser.errors else entries
+
+    def analyze(self):
+        analyzer = SemanticAnalysis()
+        table = analyzer.symbol_table = SymbolTrace()
+        reanalyzed = 0
+        for entry in self.entries:
+            line = entry.node.line
+            if entry.reads is not None and table.matches(entry.reads):
+                table.replay(entry.writes)
+                if line != entry.analyzed_line and entry.diagnostics:
+                    shift = line - entry.analyzed_line
+                    entry.diagnostics = [Diagnostic(d.message, d.line + shift if d.line is not None else None, d.column)
+                                         for d in entry.diagnostics]
+                analyzer.errors.extend(entry.diagnostics)
+            else:
+                table.start()
+                count = len(analyzer.errors)
+                analyzer.analyze_statements([entry.node])
+                entry.reads = table.reads
+                entry.writes = table.writes
+                entry.diagnostics = analyzer.errors[count:]
+                reanalyzed += 1
+            entry.analyzed_line = line
+
+        self.symbol_table = table
+        self.semantic_errors = analyzer.errors
+        self.stats["reanalyzed"] = reanalyzed
+        return table
+
+    def generate(self):
+        # Statements are numbered as a full pass would number them, so the
+        # IR matches IntermediateCode on the whole program.
+        code = []
+        temps = labels = 0
+        regenerated = 0
+        for entry in self.entries:
+            line = entry.node.line
+            if entry.code is None:
+                ic = IntermediateCode(temps, labels)
+                ic.generate(entry.node)
+                entry.code = ic.get_code()
+                entry.temps = ic.temp_count - temps
+                entry.labels = ic.label_count - labels
+                regenerated += 1
+            elif (entry.temp_base, entry.label_base, entry.code_line) != (temps, labels, line):
+                line_shift = line - entry.code_line if line is not None and entry.code_line is not None else 0
+                entry.code = renumber(entry.code,
+                                      range(entry.temp_base, entry.temp_base + entry.temps), temps - entry.temp_base,
+                                      range(entry.label_base, entry.label_base + entry.labels),
+                                      labels - entry.label_base, line_shift)
+            entry.temp_base, entry.label_base, entry.code_line = temps, labels, line
+            code.extend(entry.code)
+            temps += entry.temps
+            labels += entry.labels
+
+        self.code = code
+        self.stats["regenerated"] = regenerated
+        return code
@@ -0,0 +1,101 @@
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+def count_nodes(node):
+    count = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.children())
+    return count
+
+
+class PhaseRecord():
+    __slots__ = ('name', 'wall', 'cpu', 'peak_memory', 'items')
+
+    def __init__(self, name):
+        self.name = name
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.peak_memory = None
+        self.items = {}
+
+    def as_dict(self):
+        return {
+            "name": self.name,
+            "wall": self.wall,
+            "cpu": self.cpu,
+            "peak_memory": self.peak_memory,
+            "items": dict(self.items),
+        }
+
+    def __str__(self):
+        text = f"{self.name:<10} {self.wall * 1000:9.2f}ms wall {self.cpu * 1000:9.2f}ms cpu"
+        if self.peak_memory is not None:
+            text += f" {self.peak_memory / 1024:10.1f}KiB peak"
+        if self.items:
+            text += "  " + ", ".join(f"{key}={value}" for key, value in self.items.items())
+        return text
+
+
+class Instrumentation():
+
+    def __init__(self, trace_memory=True, sinks=()):
+        self.trace_memory = trace_memory
+        self.sinks = list(sinks)
+        self.records = []
+        self.started_tracing = False
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+
+    @contextmanager
+    def phase(self, name):
+        record = PhaseRecord(name)
+
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.started_tracing = True
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield record
+        finally:
+            record.wall = time.perf_counter() - wall
+            record.cpu = time.process_time() - cpu
+            if self.trace_memory:
+                record.peak_memory = max(0, tracemalloc.get_traced_memory()[1] - baseline)
+
+            self.records.append(record)
+            for sink in self.sinks:
+                sink(record)
+
+    def close(self):
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def as_dict(self):
+        return [record.as_dict() for record in self.records]
+
+    def report(self):
+        lines = [str(record) for record in self.records]
+        total = sum(record.wall for record in self.records)
+        lines.append(f"{'total':<10} {total * 1000:9.2f}ms wall")
+        return "\n".join(lines)
+
+
+@contextmanager
+def measure(instrument, name):
+    if instrument is None:
+        yield PhaseRecord(name)
+    else:
+        with instrument.phase(name) as record:
+            yield record
@@ -3,14 +3,23 @@ from .syntax import (
     StringLiteral, IntLiteral, ArrayLiteral, SliceExpr, ForEachLoop,
     WhileLoop, BinaryOp, ArrayAccess, FunctionCall
 )
+from .visitor import NodeVisitor, operator_chain
+from .ir import (
+    Instruction, Var, Const,
+    LABEL, GOTO, IF, PRINT, ASSIGN, BINOP, CALL, INDEX, SLICE, ARRAY
+)
 
 
-class IntermediateCode():
+class IntermediateCode(NodeVisitor):
+    prefix = "generate_"
 
-    def __init__(self):
+    def __init__(self, temp_count=0, label_count=0):
+        # Numbering can start past the temps and labels of code generated
+        # separately, so the pieces can be concatenated.
         self.code = []
-        self.temp_count = 0
-        self.label_count = 0
+        self.temp_count = temp_count
+        self.label_count = label_count
+        self.line = None
 
     def new_temp(self):
         temp = f"t{self.temp_count}"
@@ -23,15 +32,36 @@ class IntermediateCode():
         return label
 
     def emit(self, instruction):
+        instruction.line = self.line
         self.code.append(instruction)
 
-    def generate(self, node):
-        method_name = f"generate_{type(node).__name__}"
-        method = getattr(self, method_name, self.generic_generate)
-        return method(node)
+    def emit_store(self, name, expression, typename=None):
+        start = len(self.code)
+        value = self.generate(expression)
 
-    def generic_generate(self, node):
-        raise Exception(f"No generate_{type(node).__name__} method defined")
+        # A temp defined by the last instruction of this expression is only
+        # read by the store, so write the result straight into the variable.
+        if type(value) is Var and len(self.code) > start and self.code[-1].dest == value.name:
+            self.code[-1].dest = name
+            self.code[-1].typename = typename
+        else:
+            self.emit(Instruction(ASSIGN, dest=name, operands=[value], typename=typename))
+
+    def generate(self, node):
+        method = self.dispatch.get(type(node))
+        if method is None:
+            return self.generic_visit(node)
+        
+        line = node.line
+        if line is None:
+            return method(self, node)
+        
+        outer_line = self.line
+        self.line = line
+        try:
+            return method(self, node)
+        finally:
+            self.line = outer_line
 
     def generate_Program(self, node):
         for stmt in node.statements:
@@ -39,37 +69,39 @@ class IntermediateCode():
         return self.code
 
     def generate_Declaration(self, node):
-        expr_result = self.generate(node.expression)
-        self.emit(f"{node.typename} {node.name} = {expr_result}")
+        self.emit_store(node.name, node.expression, node.typename)
 
     def generate_Assignment(self, node):
-        expr_result = self.generate(node.expression)
-        self.emit(f"{node.name} = {expr_result}")
+        self.emit_store(node.name, node.expression)
 
     def generate_Print(self, node):
         printable_result = self.generate(node.printable)
-        self.emit(f"print {printable_result}")
+        self.emit(Instruction(PRINT, operands=[printable_result]))
 
     def generate_Identifier(self, node):
-        return node.name
+        return Var(node.name)
 
     def generate_StringLiteral(self, node):
-        return node.value
+        return Const(node.value[1:-1])
 
     def generate_IntLiteral(self, node):
-        return str(node.value)
+        return Const(node.value)
 
     def generate_ArrayLiteral(self, node):
         elements = []
         for elem in node.elements:
             elem_result = self.generate(elem)
             elements.append(elem_result)
-        return "{" + ", ".join(elements) + "}"
+        temp = self.new_temp()
+        self.emit(Instruction(ARRAY, dest=temp, operands=elements))
+        return Var(temp)
 
     def generate_SliceExpr(self, node):
         start_result = self.generate(node.start)
         end_result = self.generate(node.end)
-        return f"{node.name}[{start_result}:{end_result}]"
+        temp = self.new_temp()
+        self.emit(Instruction(SLICE, dest=temp, operands=[Var(node.name), start_result, end_result]))
+        return Var(temp)
 
     def generate_ForEachLoop(self, node):
         label_start = self.new_label()
@@ -78,58 +110,64 @@ class IntermediateCode():
         
         iter_temp = self.new_temp()
         
-        self.emit(f"{iter_temp} = iterator({node.iterable})")
-        self.emit(f"{label_start}:")
-        self.emit(f"if has_next({iter_temp}) goto {label_body}")
-        self.emit(f"goto {label_end}")
-        self.emit(f"{label_body}:")
-        self.emit(f"string {node.var} = next({iter_temp})")
+        self.emit(Instruction(CALL, dest=iter_temp, operands=[Var(node.iterable)], op="iterator"))
+        self.emit(Instruction(LABEL, target=label_start))
+        self.emit(Instruction(IF, operands=[Var(iter_temp)], target=label_body, op="has_next"))
+        self.emit(Instruction(GOTO, target=label_end))
+        self.emit(Instruction(LABEL, target=label_body))
+        self.emit(Instruction(CALL, dest=node.var, operands=[Var(iter_temp)], op="next", typename="string"))
         
         for stmt in node.body:
             self.generate(stmt)
         
-        self.emit(f"goto {label_start}")
-        self.emit(f"{label_end}:")
+        self.emit(Instruction(GOTO, target=label_start))
+        self.emit(Instruction(LABEL, target=label_end))
 
     def generate_WhileLoop(self, node):
         label_start = self.new_label()
         label_body = self.new_label()
         label_end = self.new_label()
         
-        self.emit(f"{label_start}:")
+        self.emit(Instruction(LABEL, target=label_start))
         
         condition_temp = self.generate(node.condition)
         
-        self.emit(f"if {condition_temp} goto {label_body}")
-        self.emit(f"goto {label_end}")
-        self.emit(f"{label_body}:")
+        self.emit(Instruction(IF, operands=[condition_temp], target=label_body))
+        self.emit(Instruction(GOTO, target=label_end))
+        self.emit(Instruction(LABEL, target=label_body))
         
         for stmt in node.body:
             self.generate(stmt)
         
-        self.emit(f"goto {label_start}")
-        self.emit(f"{label_end}:")
+        self.emit(Instruction(GOTO, target=label_start))
+        self.emit(Instruction(LABEL, target=label_end))
 
     def generate_BinaryOp(self, node):
-        left_result = self.generate(node.left)
-        right_result = self.generate(node.right)
-        
-        temp = self.new_temp()
-        self.emit(f"{temp} = {left_result} {node.operator} {right_result}")
-        return temp
+        # Emits the same instructions as recursing into node.left, but walks
+        # long operator chains in a loop.
+        operand, chain = operator_chain(node)
+        result = self.generate(operand)
+        for binary in chain:
+            right_result = self.generate(binary.right)
+            temp = self.new_temp()
+            self.emit(Instruction(BINOP, dest=temp, operands=[result, right_result], op=binary.operator))
+            result = Var(temp)
+        return result
 
     def generate_ArrayAccess(self, node):
         index_result = self.generate(node.index)
-        return f"{node.name}[{index_result}]"
+        temp = self.new_temp()
+        self.emit(Instruction(INDEX, dest=temp, operands=[Var(node.name), index_result]))
+        return Var(temp)
 
     def generate_FunctionCall(self, node):
         if node.name in ("length", "size"):
             arg_result = self.generate(node.arguments[0])
             temp = self.new_temp()
-            self.emit(f"{temp} = {node.name}({arg_result})")
-            return temp
+            self.emit(Instruction(CALL, dest=temp, operands=[arg_result], op=node.name))
+            return Var(temp)
         
-        return "unknown"
+        return Var("unknown")
 
     def print_code(self):
         print("\n=== Intermediate Code ===")
@@ -138,4 +176,4 @@ class IntermediateCode():
         print("=" * 25)
 
     def get_code(self):
-        return self.code
\ No newline at end of file
+        return self.code
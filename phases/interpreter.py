@@ -1,3 +1,43 @@
+import time
+
+from .ir import Var, LABEL, GOTO, IF, IFFALSE, PRINT, ASSIGN, BINOP, CALL, INDEX, SLICE, ARRAY
+
+OP_MOVE = 0
+OP_ADD = 1
+OP_SUB = 2
+OP_MUL = 3
+OP_DIV = 4
+OP_LT = 5
+OP_GT = 6
+OP_LE = 7
+OP_GE = 8
+OP_EQ = 9
+OP_NE = 10
+OP_INDEX = 11
+OP_SLICE = 12
+OP_ARRAY = 13
+OP_LEN = 14
+OP_ITER = 15
+OP_NEXT = 16
+OP_PRINT = 17
+OP_JUMP = 18
+OP_JUMP_IF = 19
+OP_JUMP_HAS_NEXT = 20
+OP_JUMP_IF_NOT = 21
+OP_JUMP_NO_NEXT = 22
+
+JUMP_OPCODES = (OP_JUMP, OP_JUMP_IF, OP_JUMP_HAS_NEXT, OP_JUMP_IF_NOT, OP_JUMP_NO_NEXT)
+
+BINARY_OPCODES = {
+    '+': OP_ADD, '-': OP_SUB, '*': OP_MUL, '/': OP_DIV,
+    '<': OP_LT, '>': OP_GT, '<=': OP_LE, '>=': OP_GE, '==': OP_EQ, '!=': OP_NE,
+}
+
+CALL_OPCODES = {
+    'length': OP_LEN, 'size': OP_LEN, 'iterator': OP_ITER, 'next': OP_NEXT,
+}
+
+
 class Interpreter():
 
     def __init__(self, optimized_code):
@@ -5,309 +45,225 @@ class Interpreter():
         self.variables = {}
         self.pc = 0
         self.labels = {}
+        self.bytecode = []
+        self.constants = {}
+        self.slots = {}
+        self.frame = []
+        self.steps = 0
+        self.positions = []
 
     def execute(self):
         print("\n=== Executing Program ===")
         print("Output:")
         print("-" * 30)
         
-        self.find_labels()
-        
-        self.pc = 0
-        while self.pc < len(self.intermediate_code):
-            instruction = self.intermediate_code[self.pc].strip()
-            
-            if not instruction or instruction.endswith(':'):
-                self.pc += 1
-                continue
-            
-            old_pc = self.pc
-            self.execute_instruction(instruction)
-            if self.pc == old_pc:
-                self.pc += 1
+        self.compile()
+        self.run()
         
         print("-" * 30)
         print("Program execution complete!")
         print("=" * 30)
 
     def find_labels(self):
-        for i, instruction in enumerate(self.intermediate_code):
-            instruction = instruction.strip()
-            if instruction.endswith(':'):
-                label_name = instruction[:-1]
-                self.labels[label_name] = i
-
-    def execute_instruction(self, instruction):
-        if instruction.startswith('print '):
-            self.execute_print(instruction)
-        elif instruction.startswith('if '):
-            self.execute_if(instruction)
-        elif instruction.startswith('goto '):
-            self.execute_goto(instruction)
-        elif '=' in instruction:
-            self.execute_assignment(instruction)
-
-    def execute_assignment(self, instruction):
-        parts = instruction.split('=', 1)
-        if len(parts) != 2:
-            return
-        
-        lhs = parts[0].strip()
-        rhs = parts[1].strip()
-        
-        lhs_tokens = lhs.split()
-        var_name = lhs_tokens[-1] if lhs_tokens else ''
-        
-        if not var_name:
-            return
-        
-        value = self.evaluate_expression(rhs)
-        if value is not None:
-            self.variables[var_name] = value
-
-    def execute_print(self, instruction):
-        expr = instruction.split('print ', 1)[1].strip()
-        value = self.evaluate_expression(expr)
-        
-        if isinstance(value, list):
-            print(value)
-        else:
-            print(value)
-
-    def execute_if(self, instruction):
-        parts = instruction.split('goto')
-        condition = parts[0].replace('if', '').strip()
-        label = parts[1].strip()
-        
-        if self.evaluate_condition(condition):
-            if label in self.labels:
-                self.pc = self.labels[label]
-
-    def execute_goto(self, instruction):
-        label = instruction.split('goto')[1].strip()
-        
-        if label in self.labels:
-            self.pc = self.labels[label]
+        position = 0
+        for instruction in self.intermediate_code:
+            if instruction.opcode == LABEL:
+                self.labels[instruction.target] = position
+            else:
+                position += 1
 
-    def evaluate_expression(self, expr):
-        expr = expr.strip()
-        
-        if expr.startswith('"') and expr.endswith('"'):
-            return expr[1:-1]
+    def compile(self):
+        # Each instruction becomes a flat (opcode, dest, a, b, c) tuple whose
+        # operands are frame slots; jumps keep their resolved target in dest.
+        self.find_labels()
+        self.bytecode = []
+        self.positions = []
         
-        if isinstance(expr, int):
-            return expr
+        for index, instruction in enumerate(self.intermediate_code):
+            opcode = instruction.opcode
+            if opcode == LABEL:
+                continue
+            
+            self.positions.append(index)
+            operands = [self.operand_slot(o) for o in instruction.operands]
+            operands += [None] * (3 - len(operands))
+            a, b, c = operands[:3]
+            dest = self.slot(instruction.dest) if instruction.dest is not None else None
+            position = len(self.bytecode)
+            
+            if opcode == GOTO or opcode == IF or opcode == IFFALSE:
+                target = self.labels.get(instruction.target, position + 1)
+                if opcode == GOTO:
+                    self.bytecode.append((OP_JUMP, target, None, None, None))
+                elif opcode == IF:
+                    op = OP_JUMP_HAS_NEXT if instruction.op == 'has_next' else OP_JUMP_IF
+                    self.bytecode.append((op, target, a, None, None))
+                else:
+                    op = OP_JUMP_NO_NEXT if instruction.op == 'has_next' else OP_JUMP_IF_NOT
+                    self.bytecode.append((op, target, a, None, None))
+            elif opcode == PRINT:
+                self.bytecode.append((OP_PRINT, None, a, None, None))
+            elif opcode == ASSIGN:
+                self.bytecode.append((OP_MOVE, dest, a, None, None))
+            elif opcode == BINOP:
+                self.bytecode.append((BINARY_OPCODES[instruction.op], dest, a, b, None))
+            elif opcode == INDEX:
+                self.bytecode.append((OP_INDEX, dest, a, b, None))
+            elif opcode == SLICE:
+                self.bytecode.append((OP_SLICE, dest, a, b, c))
+            elif opcode == ARRAY:
+                elements = tuple(self.operand_slot(o) for o in instruction.operands)
+                self.bytecode.append((OP_ARRAY, dest, elements, None, None))
+            elif opcode == CALL:
+                self.bytecode.append((CALL_OPCODES[instruction.op], dest, a, None, None))
+        
+        return self.bytecode
 
-        if isinstance(expr, bool):
-            return expr
+    def slot(self, name):
+        slot = self.slots.get(name)
+        if slot is None:
+            slot = len(self.frame)
+            self.slots[name] = slot
+            self.frame.append(None)
+        return slot
 
-        if isinstance(expr, str):
-            if expr.isdigit() or (expr.startswith('-') and expr[1:].isdigit()):
-                return int(expr)
+    def operand_slot(self, operand):
+        if type(operand) is Var:
+            return self.slot(operand.name)
+        
+        # Constants get their own pre-filled slots, so every operand is read
+        # the same way at run time.
+        slot = self.constants.get(operand)
+        if slot is None:
+            slot = len(self.frame)
+            self.constants[operand] = slot
+            self.frame.append(operand.value)
+        return slot
 
-        
-        if expr.startswith('{') and expr.endswith('}'):
-            elements = expr[1:-1].split(',')
-            return [self.evaluate_expression(e.strip()) for e in elements if e.strip()]
-        
-        if '[' in expr and ':' in expr and ']' in expr and 'iterator' not in expr:
-            parts = expr.split('[')
-            var_name = parts[0].strip()
-            slice_part = parts[1].split(']')[0]
-            
-            if ':' in slice_part:
-                start_str, end_str = slice_part.split(':', 1)
-                start = self.evaluate_expression(start_str.strip())
-                end = self.evaluate_expression(end_str.strip())
-                
-                if isinstance(start, str) and start.isdigit():
-                    start = int(start)
-                elif isinstance(start, str):
-                    start_val = self.variables.get(start)
-                    if isinstance(start_val, int):
-                        start = start_val
-                    elif isinstance(start_val, str) and start_val.isdigit():
-                        start = int(start_val)
-                
-                if isinstance(end, str) and end.isdigit():
-                    end = int(end)
-                elif isinstance(end, str):
-                    end_val = self.variables.get(end)
-                    if isinstance(end_val, int):
-                        end = end_val
-                    elif isinstance(end_val, str) and end_val.isdigit():
-                        end = int(end_val)
-                
-                var_value = self.variables.get(var_name)
-                if var_value is not None:
-                    if isinstance(start, int) and isinstance(end, int):
-                        if 0 <= start <= end < len(var_value):
-                            return var_value[start:end+1]
-                        elif 0 <= start < len(var_value):
-                            return var_value[start:min(end+1, len(var_value))]
-            return None
-        
-        if '[' in expr and ']' in expr and ':' not in expr:
-            var_name = expr.split('[')[0].strip()
-            index_expr = expr.split('[')[1].split(']')[0]
-            index = self.evaluate_expression(index_expr)
-            
-            if isinstance(index, str) and index.isdigit():
-                index = int(index)
-            elif isinstance(index, str):
-                index_val = self.variables.get(index)
-                if isinstance(index_val, int):
-                    index = index_val
-                elif isinstance(index_val, str) and index_val.isdigit():
-                    index = int(index_val)
+    def run(self, profiler=None):
+        code = self.bytecode
+        frame = self.frame
+        end = len(code)
+        pc = 0
+        steps = 0
+        
+        counts = times = None
+        if profiler is not None:
+            profiler.start(self)
+            counts = profiler.counts
+            times = profiler.times
+            clock = time.perf_counter
+            previous = -1
+            last = clock()
+        
+        while pc < end:
+            if counts is not None:
+                # The time since the previous dispatch is charged to the
+                # instruction that was running.
+                now = clock()
+                if previous >= 0:
+                    times[previous] += now - last
+                counts[pc] += 1
+                previous = pc
+                last = now
             
-            var_value = self.variables.get(var_name)
-            if var_value is not None and isinstance(index, int):
-                if 0 <= index < len(var_value):
-                    return var_value[index]
-            return None
-        
-        if ' + ' in expr:
-            parts = expr.split(' + ', 1)
-            left = self.evaluate_expression(parts[0].strip())
-            right = self.evaluate_expression(parts[1].strip())
+            op, dest, a, b, c = code[pc]
+            pc += 1
+            steps += 1
             
-            if isinstance(left, int) and isinstance(right, int):
-                return left + right
-            elif isinstance(left, str) and isinstance(right, str):
-                return left + right
-            else:
-                return str(left) + str(right)
-        
-        if ' - ' in expr:
-            parts = expr.split(' - ', 1)
-            left = self.evaluate_expression(parts[0].strip())
-            right = self.evaluate_expression(parts[1].strip())
-            
-            if isinstance(left, int) and isinstance(right, int):
-                return left - right
-            return 0
-        
-        if ' * ' in expr:
-            parts = expr.split(' * ', 1)
-            left = self.evaluate_expression(parts[0].strip())
-            right = self.evaluate_expression(parts[1].strip())
-            
-            if isinstance(left, int) and isinstance(right, int):
-                return left * right
-            return 0
-        
-        if ' / ' in expr:
-            parts = expr.split(' / ', 1)
-            left = self.evaluate_expression(parts[0].strip())
-            right = self.evaluate_expression(parts[1].strip())
-            
-            if isinstance(left, int) and isinstance(right, int) and right != 0:
-                return left // right
-            return 0
-        
-        for op in ['<=', '>=', '==', '!=', '<', '>']:
-            if op in expr:
-                if f' {op} ' in expr:
-                    parts = expr.split(f' {op} ', 1)
-                elif expr.startswith(op):
-                    continue
+            if op == OP_MOVE:
+                frame[dest] = frame[a]
+            elif op == OP_JUMP:
+                pc = dest
+            elif op == OP_JUMP_IF:
+                if frame[a]:
+                    pc = dest
+            elif op == OP_JUMP_IF_NOT:
+                if not frame[a]:
+                    pc = dest
+            elif op == OP_JUMP_HAS_NEXT:
+                iterator = frame[a]
+                if iterator and iterator['index'] < len(iterator['iterable']):
+                    pc = dest
+            elif op == OP_JUMP_NO_NEXT:
+                iterator = frame[a]
+                if not (iterator and iterator['index'] < len(iterator['iterable'])):
+                    pc = dest
+            elif op == OP_ADD:
+                left = frame[a]
+                right = frame[b]
+                if type(left) is type(right) and (type(left) is int or type(left) is str):
+                    frame[dest] = left + right
                 else:
-                    idx = expr.find(op)
-                    if idx > 0:
-                        parts = [expr[:idx].strip(), expr[idx+len(op):].strip()]
-                    else:
-                        continue
-                
-                left = self.evaluate_expression(parts[0].strip())
-                right = self.evaluate_expression(parts[1].strip())
-                
-                if isinstance(left, str) and left.isdigit():
-                    left = int(left)
-                if isinstance(right, str) and right.isdigit():
-                    right = int(right)
-                
-                if op == '<':
-                    return left < right
-                elif op == '>':
-                    return left > right
-                elif op == '<=':
-                    return left <= right
-                elif op == '>=':
-                    return left >= right
-                elif op == '==':
-                    return left == right
-                elif op == '!=':
-                    return left != right
-                break
-        
-        if expr.startswith('iterator('):
-            var_name = expr.split('iterator(')[1].split(')')[0]
-            var_value = self.variables.get(var_name)
-            if var_value is not None:
-                return {'iterable': var_value, 'index': 0}
-            return None
-        
-        if expr.startswith('next('):
-            iter_name = expr.split('next(')[1].split(')')[0]
-            iterator = self.variables.get(iter_name)
-            if iterator and isinstance(iterator, dict):
-                iterable = iterator['iterable']
-                index = iterator['index']
-                if index < len(iterable):
-                    element = iterable[index]
-                    self.variables[iter_name]['index'] += 1
-                    return element
-            return None
-        
-        if expr.startswith('length('):
-            arg_expr = expr.split('length(')[1].rsplit(')', 1)[0]
-            arg_value = self.evaluate_expression(arg_expr)
-            if arg_value is not None:
-                return len(arg_value)
-            return 0
-        
-        if expr.startswith('size('):
-            arg_expr = expr.split('size(')[1].rsplit(')', 1)[0]
-            arg_value = self.evaluate_expression(arg_expr)
-            if arg_value is not None:
-                return len(arg_value)
-            return 0
-        
-        if expr in self.variables:
-            return self.variables[expr]
-        
-        if expr.isdigit() or (expr.startswith('-') and expr[1:].isdigit()):
-            return int(expr)
-        
-        return expr
-
-    def evaluate_condition(self, condition):
-        condition = condition.strip()
-        
-        if condition.startswith('has_next('):
-            iter_name = condition.split('has_next(')[1].split(')')[0].strip()
-            iterator = self.variables.get(iter_name)
-            if iterator and isinstance(iterator, dict):
-                return iterator['index'] < len(iterator['iterable'])
-            return False
-        
-        result = self.evaluate_expression(condition)
-        
-        if isinstance(result, bool):
-            return result
-        
-        if isinstance(result, int):
-            return result != 0
-        
-        if isinstance(result, str):
-            return len(result) > 0
-        
-        return False
+                    frame[dest] = str(left) + str(right)
+            elif op == OP_SUB:
+                left = frame[a]
+                right = frame[b]
+                frame[dest] = left - right if type(left) is int and type(right) is int else 0
+            elif op == OP_MUL:
+                left = frame[a]
+                right = frame[b]
+                frame[dest] = left * right if type(left) is int and type(right) is int else 0
+            elif op == OP_DIV:
+                left = frame[a]
+                right = frame[b]
+                frame[dest] = left // right if type(left) is int and type(right) is int and right != 0 else 0
+            elif op == OP_LT:
+                frame[dest] = frame[a] < frame[b]
+            elif op == OP_GT:
+                frame[dest] = frame[a] > frame[b]
+            elif op == OP_LE:
+                frame[dest] = frame[a] <= frame[b]
+            elif op == OP_GE:
+                frame[dest] = frame[a] >= frame[b]
+            elif op == OP_EQ:
+                frame[dest] = frame[a] == frame[b]
+            elif op == OP_NE:
+                frame[dest] = frame[a] != frame[b]
+            elif op == OP_INDEX:
+                value = frame[a]
+                index = frame[b]
+                if value is not None and isinstance(index, int) and 0 <= index < len(value):
+                    frame[dest] = value[index]
+                else:
+                    frame[dest] = None
+            elif op == OP_NEXT:
+                iterator = frame[a]
+                frame[dest] = None
+                if iterator:
+                    index = iterator['index']
+                    if index < len(iterator['iterable']):
+                        iterator['index'] = index + 1
+                        frame[dest] = iterator['iterable'][index]
+            elif op == OP_PRINT:
+                print(frame[a])
+            elif op == OP_LEN:
+                value = frame[a]
+                frame[dest] = len(value) if value is not None else 0
+            elif op == OP_SLICE:
+                value = frame[a]
+                start = frame[b]
+                stop = frame[c]
+                frame[dest] = None
+                if value is not None and isinstance(start, int) and isinstance(stop, int):
+                    if 0 <= start < len(value):
+                        frame[dest] = value[start:stop + 1]
+            elif op == OP_ARRAY:
+                frame[dest] = [frame[e] for e in a]
+            elif op == OP_ITER:
+                value = frame[a]
+                frame[dest] = {'iterable': value, 'index': 0} if value is not None else None
+        
+        if counts is not None and previous >= 0:
+            times[previous] += clock() - last
+        
+        self.pc = pc
+        self.steps = steps
+        self.variables = {name: frame[slot] for name, slot in self.slots.items() if frame[slot] is not None}
 
     def print_variables(self):
         print("\n=== Variable State ===")
         for var, value in self.variables.items():
             if not isinstance(value, dict):
                 print(f"{var} = {value}")
-        print("=" * 25)
\ No newline at end of file
+        print("=" * 25)
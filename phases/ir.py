@@ -0,0 +1,134 @@
+LABEL = "label"
+GOTO = "goto"
+IF = "if"
+IFFALSE = "iffalse"
+PRINT = "print"
+ASSIGN = "assign"
+BINOP = "binop"
+CALL = "call"
+INDEX = "index"
+SLICE = "slice"
+ARRAY = "array"
+
+SIDE_EFFECT_CALLS = ("iterator", "next")
+
+
+def is_temp(name):
+    return name.startswith('t') and len(name) > 1 and name[1:].isdigit()
+
+
+class Var():
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+    def __eq__(self, other):
+        return type(other) is Var and other.name == self.name
+
+    def __hash__(self):
+        return hash(('var', self.name))
+
+    def __str__(self):
+        return self.name
+
+    def __repr__(self):
+        return f"Var({self.name!r})"
+
+
+class Const():
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return type(other) is Const and type(other.value) is type(self.value) and other.value == self.value
+
+    def __hash__(self):
+        return hash(('const', type(self.value).__name__, self.value))
+
+    def __str__(self):
+        if isinstance(self.value, str):
+            return f'"{self.value}"'
+        return str(self.value)
+
+    def __repr__(self):
+        return f"Const({self.value!r})"
+
+
+class Instruction():
+    __slots__ = ('opcode', 'dest', 'operands', 'target', 'op', 'typename', 'line')
+
+    def __init__(self, opcode, dest=None, operands=(), target=None, op=None, typename=None, line=None):
+        self.opcode = opcode
+        self.dest = dest
+        self.operands = tuple(operands)
+        self.target = target
+        self.op = op
+        self.typename = typename
+        self.line = line
+
+    def uses(self):
+        return [operand.name for operand in self.operands if type(operand) is Var]
+
+    def is_jump(self):
+        return self.opcode == GOTO or self.opcode == IF or self.opcode == IFFALSE
+
+    def is_conditional(self):
+        return self.opcode == IF or self.opcode == IFFALSE
+
+    def has_side_effects(self):
+        if self.opcode in (LABEL, GOTO, IF, IFFALSE, PRINT):
+            return True
+        return self.opcode == CALL and self.op in SIDE_EFFECT_CALLS
+
+    def expression(self):
+        # The computation an instruction performs, as a hashable key, when
+        # repeating it with the same operands always gives the same value.
+        if self.opcode in (BINOP, INDEX, SLICE) or (self.opcode == CALL and self.op not in SIDE_EFFECT_CALLS):
+            return (self.opcode, self.op, self.operands)
+        return None
+
+    def copy(self, **changes):
+        instruction = Instruction(self.opcode, self.dest, self.operands, self.target, self.op, self.typename,
+                                  self.line)
+        for field, value in changes.items():
+            setattr(instruction, field, tuple(value) if field == 'operands' else value)
+        return instruction
+
+    def __str__(self):
+        opcode = self.opcode
+        operands = self.operands
+
+        if opcode == LABEL:
+            return f"{self.target}:"
+        if opcode == GOTO:
+            return f"goto {self.target}"
+        if opcode == IF or opcode == IFFALSE:
+            keyword = "if" if opcode == IF else "ifFalse"
+            if self.op:
+                return f"{keyword} {self.op}({operands[0]}) goto {self.target}"
+            return f"{keyword} {operands[0]} goto {self.target}"
+        if opcode == PRINT:
+            return f"print {operands[0]}"
+
+        lhs = f"{self.typename} {self.dest}" if self.typename else self.dest
+        if opcode == ASSIGN:
+            rhs = str(operands[0])
+        elif opcode == BINOP:
+            rhs = f"{operands[0]} {self.op} {operands[1]}"
+        elif opcode == CALL:
+            rhs = f"{self.op}({', '.join(str(o) for o in operands)})"
+        elif opcode == INDEX:
+            rhs = f"{operands[0]}[{operands[1]}]"
+        elif opcode == SLICE:
+            rhs = f"{operands[0]}[{operands[1]}:{operands[2]}]"
+        elif opcode == ARRAY:
+            rhs = "{" + ", ".join(str(o) for o in operands) + "}"
+        else:
+            rhs = f"{opcode} " + ", ".join(str(o) for o in operands)
+        return f"{lhs} = {rhs}"
+
+    def __repr__(self):
+        return f"Instruction({str(self)!r})"
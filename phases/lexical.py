@@ -1,19 +1,80 @@
 import re
+from collections import namedtuple
+
+TOKENS = (
+    ("KEYWORD",    r'\b(string|int|array|for|while|if|else|return|in)\b'),
+    ("COUT",       r'\bcout\b'),
+    ("SHL",        r'<<'),
+    ("EQ",         r'=='),
+    ("NEQ",        r'!='),
+    ("LE",         r'<='),
+    ("GE",         r'>='),
+    ("ASSIGN",     r'='),
+    ("LT",         r'<'),
+    ("GT",         r'>'),
+    ("PLUS",       r'\+'),
+    ("MINUS",      r'-'),
+    ("MUL",        r'\*'),
+    ("DIV",        r'/'),
+    ("LPAREN",     r'\('),
+    ("RPAREN",     r'\)'),
+    ("LBRACE",     r'\{'),
+    ("RBRACE",     r'\}'),
+    ("LBRACKET",   r'\['),
+    ("RBRACKET",   r'\]'),
+    ("COLON",      r':'),
+    ("SEMICOLON",  r';'),
+    ("COMMA",      r','),
+    ("STRING_LITERAL", r'"[^"\n]*"'),
+    ("NUMBER",     r'\b\d+\b'),
+    ("IDENTIFIER", r'\b[a-zA-Z_][a-zA-Z_0-9]*\b'),
+    ("COMMENT",    r'//[^\n]*'),
+    ("WHITESPACE", r'[ \t\n]+'),
+)
+
+SKIPPED_TOKENS = ("WHITESPACE", "COMMENT")
+
+Token = namedtuple("Token", ("type", "value", "line", "column", "offset"))
+
+pattern_cache = {}
+
+
+def compile_tokens(tokens):
+    key = tuple((t, r) for t, r in tokens)
+    pattern = pattern_cache.get(key)
+    if pattern is None:
+        combined_regex = "|".join(f"(?P<{t}>{r})" for t, r in key)
+        pattern = re.compile(combined_regex)
+        pattern_cache[key] = pattern
+    return pattern
+
 
 class LexicalAnalysis():
-    def __init__(self,tokens):
+    def __init__(self, tokens=TOKENS):
         self.token_specs = tokens
+        self.pattern = compile_tokens(tokens)
 
     def lexer(self, code):
         tokens = []
-        combined_regex = "|".join(f"(?P<{t}>{r})" for t, r in self.token_specs)
-        pattern = re.compile(combined_regex)
-        
-        for match in pattern.finditer(code):
+        for match in self.pattern.finditer(code):
             token_type = match.lastgroup
-            value = match.group(token_type)
-            if token_type in ("WHITESPACE", "COMMENT"):
+            if token_type in SKIPPED_TOKENS:
                 continue
-            tokens.append((token_type, value))
+            tokens.append((token_type, match.group()))
         return tokens
 
+    def tokenize(self, code, start=0, line=1):
+        # Lexing can resume at the start of any line, given its number.
+        line_start = start
+        for match in self.pattern.finditer(code, start):
+            token_type = match.lastgroup
+            value = match.group()
+            offset = match.start()
+            if token_type not in SKIPPED_TOKENS:
+                yield Token(token_type, value, line, offset - line_start + 1, offset)
+            elif token_type == "WHITESPACE" and "\n" in value:
+                line += value.count("\n")
+                line_start = offset + value.rindex("\n") + 1
+
+
+default_lexer = LexicalAnalysis()
@@ -1,216 +1,515 @@
+import itertools
+import time
+
+from .cfg import ControlFlowGraph
+from .ir import (
+    Instruction, Var, Const,
+    is_temp, LABEL, GOTO, IF, IFFALSE, ASSIGN, BINOP, CALL, INDEX, SLICE, ARRAY
+)
+
+FOLDABLE_OPERATORS = {
+    '+': lambda a, b: a + b,
+    '-': lambda a, b: a - b,
+    '*': lambda a, b: a * b,
+    '/': lambda a, b: a // b,
+    '<': lambda a, b: a < b,
+    '>': lambda a, b: a > b,
+    '<=': lambda a, b: a <= b,
+    '>=': lambda a, b: a >= b,
+    '==': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+}
+
+# Operators whose operands can be swapped, for every operand type; `+` also
+# concatenates strings, so it is not one of them.
+COMMUTATIVE_OPERATORS = ('*', '==', '!=')
+
+
+STANDARD_PASSES = (
+    "constant_folding",
+    "algebraic_simplification",
+    "local_value_numbering",
+    "copy_propagation",
+    "dead_code_elimination",
+    "remove_unreachable_code",
+    "jump_threading",
+    "branch_inversion",
+    "remove_redundant_labels",
+    "loop_invariant_code_motion",
+)
+
+# -O1 runs its passes once; -O2 also numbers values across blocks, rotates
+# loops and repeats everything until a whole sweep leaves the code unchanged
+# or the budget runs out.
+OPTIMIZATION_LEVELS = {
+    0: (),
+    1: STANDARD_PASSES,
+    2: STANDARD_PASSES + ("global_value_numbering", "loop_rotation"),
+}
+
+# Loop headers longer than this are not duplicated by loop rotation.
+MAX_ROTATED_HEADER = 8
+
+DEFAULT_LEVEL = 1
+DEFAULT_MAX_ITERATIONS = 10
+
+
+class PassStats():
+    __slots__ = ('name', 'runs', 'changes', 'removed', 'time')
+
+    def __init__(self, name):
+        self.name = name
+        self.runs = 0
+        self.changes = 0
+        self.removed = 0
+        self.time = 0.0
+
+    def as_dict(self):
+        return {"name": self.name, "runs": self.runs, "changes": self.changes,
+                "removed": self.removed, "time": self.time}
+
+    def format(self, width=0):
+        return (f"{self.name:<{width}} {self.runs:>4} runs {self.changes:>4} changed "
+                f"{self.removed:>5} removed {self.time * 1000:9.2f}ms")
+
+    def __str__(self):
+        return self.format()
+
+
+def format_pass_stats(stats):
+    # Names are padded to the longest one in the report so columns line up.
+    stats = list(stats)
+    width = max((len(s.name) for s in stats), default=0)
+    return [s.format(width) for s in stats]
+
+
 class Optimizer():
 
-    def __init__(self, intermediate_code):
+    def __init__(self, intermediate_code, level=DEFAULT_LEVEL, max_iterations=DEFAULT_MAX_ITERATIONS):
+        if level not in OPTIMIZATION_LEVELS:
+            raise ValueError(f"Unknown optimization level: {level}")
         self.code = intermediate_code.copy()
         self.optimized = False
+        self.level = level
+        self.max_iterations = max_iterations
+        self.original_size = len(self.code)
+        self.iterations = 0
+        self.converged = False
+        self.stats = {}
 
     def optimize(self):
-        print("\n=== Starting Optimization ===")
-        print(f"Original instructions: {len(self.code)}")
-        
-        self.dead_code_elimination()
-        self.constant_folding()
-        self.copy_propagation()
-        self.remove_redundant_labels()
-        self.remove_unreachable_code()
+        passes = OPTIMIZATION_LEVELS[self.level]
+        rounds = max(1, self.max_iterations) if self.level >= 2 else 1
         
-        print(f"Optimized instructions: {len(self.code)}")
-        print("=" * 30)
+        for _ in range(rounds if passes else 0):
+            self.iterations += 1
+            changed = False
+            for name in passes:
+                changed = self.run_pass(name) or changed
+            if not changed:
+                self.converged = True
+                break
         
         return self.code
 
+    def run_pass(self, name):
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = PassStats(name)
+        
+        size = len(self.code)
+        self.optimized = False
+        start = time.perf_counter()
+        getattr(self, name)()
+        stats.time += time.perf_counter() - start
+        stats.runs += 1
+        stats.removed += size - len(self.code)
+        if self.optimized:
+            stats.changes += 1
+        return self.optimized
+
+    def report(self):
+        lines = [f"Level: -O{self.level}",
+                 f"Instructions: {self.original_size} -> {len(self.code)}",
+                 f"Iterations: {self.iterations}" + (" (fixpoint)" if self.converged else "")]
+        lines.extend(format_pass_stats(self.stats.values()))
+        return "\n".join(lines)
+
     def dead_code_elimination(self):
-        used_vars = set()
-        
-        def extract_vars_from_expr(expr):
-            vars_found = set()
-            if '(' in expr:
-                func_parts = expr.split('(')
-                for part in func_parts[1:]:
-                    arg_part = part.split(')')[0]
-                    for token in arg_part.replace(',', ' ').replace('(', ' ').replace(')', ' ').split():
-                        token = token.strip()
-                        if token and ((token[0].isalpha() or token[0] == '_') and (token.replace('_', '').isalnum() or (token.startswith('t') and len(token) > 1 and token[1:].isdigit()))):
-                            vars_found.add(token)
-            if '[' in expr:
-                arr_name = expr.split('[')[0].strip()
-                vars_found.add(arr_name)
-                bracket_start = expr.find('[')
-                bracket_end = expr.find(']', bracket_start)
-                if bracket_end > bracket_start:
-                    index_part = expr[bracket_start+1:bracket_end]
-                    if ':' in index_part:
-                        for part in index_part.split(':'):
-                            part = part.strip()
-                            if part and not part.isdigit() and not (part.startswith('-') and part[1:].isdigit()):
-                                if (part[0].isalpha() or part[0] == '_') and (part.replace('_', '').isalnum() or (part.startswith('t') and len(part) > 1 and part[1:].isdigit())):
-                                    vars_found.add(part)
-                    else:
-                        index_part = index_part.strip()
-                        if index_part and not index_part.isdigit() and not (index_part.startswith('-') and index_part[1:].isdigit()):
-                            if (index_part[0].isalpha() or index_part[0] == '_') and (index_part.replace('_', '').isalnum() or (index_part.startswith('t') and len(index_part) > 1 and index_part[1:].isdigit())):
-                                vars_found.add(index_part)
-            for op in [' + ', ' - ', ' * ', ' / ', ' < ', ' > ', ' <= ', ' >= ', ' == ', ' != ']:
-                if op in expr:
-                    parts = expr.split(op, 1)
-                    for part in parts:
-                        part = part.strip()
-                        if not (part.startswith('"') or part.startswith('{')):
-                            for token in part.split():
-                                token = token.strip()
-                                if token and ((token[0].isalpha() or token[0] == '_') and (token.replace('_', '').isalnum() or (token.startswith('t') and len(token) > 1 and token[1:].isdigit()))):
-                                    vars_found.add(token)
-                    break
-            if not any(op in expr for op in [' + ', ' - ', ' * ', ' / ', ' < ', ' > ', ' <= ', ' >= ', ' == ', ' != ', '[', '(']):
-                expr_clean = expr.strip()
-                if expr_clean and not expr_clean.startswith('"') and not expr_clean.startswith('{') and not expr_clean.isdigit():
-                    if (expr_clean[0].isalpha() or expr_clean[0] == '_') and (expr_clean.replace('_', '').isalnum() or (expr_clean.startswith('t') and len(expr_clean) > 1 and expr_clean[1:].isdigit())):
-                        vars_found.add(expr_clean)
-            return vars_found
-        
-        for i in range(len(self.code) - 1, -1, -1):
-            instruction = self.code[i].strip()
+        # Dropping one definition can make the values it read dead in
+        # earlier blocks, so repeat until liveness stops changing the code.
+        changed = True
+        while changed:
+            changed = False
+            cfg = ControlFlowGraph(self.code)
+            live_in, live_out = cfg.liveness()
+            new_code = []
             
-            if instruction.startswith('print '):
-                expr = instruction.split('print ', 1)[1].strip()
-                used_vars.update(extract_vars_from_expr(expr))
+            for block in cfg.blocks:
+                live = set(live_out[block.index])
+                kept = []
+                for instruction in reversed(block.instructions):
+                    var_name = instruction.dest
+                    if var_name is not None and var_name not in live and not instruction.has_side_effects():
+                        changed = True
+                        continue
+                    if var_name is not None:
+                        live.discard(var_name)
+                    live.update(instruction.uses())
+                    kept.append(instruction)
+                kept.reverse()
+                new_code.extend(kept)
             
-            if instruction.startswith('if '):
-                condition = instruction.split('goto')[0].replace('if', '').strip()
-                used_vars.update(extract_vars_from_expr(condition))
+            if changed:
+                self.optimized = True
+            self.code = new_code
+
+    def constant_folding(self):
+        cfg = ControlFlowGraph(self.code)
+        reaching = cfg.reaching_definitions()
+        new_code = []
         
-        changed = True
-        iterations = 0
-        max_iterations = 10
-        while changed and iterations < max_iterations:
-            changed = False
-            iterations += 1
-            for i in range(len(self.code) - 1, -1, -1):
-                instruction = self.code[i].strip()
+        for block in cfg.blocks:
+            constants, arrays = self.known_values(cfg, reaching[block.index])
+            
+            for instruction in block.instructions:
+                if constants and any(type(o) is Var and o.name in constants for o in instruction.operands):
+                    operands = [constants.get(o.name, o) if type(o) is Var else o for o in instruction.operands]
+                    instruction = instruction.copy(operands=operands)
+                    self.optimized = True
+                
+                if instruction.is_conditional() and instruction.op is None and type(instruction.operands[0]) is Const:
+                    # A constant condition either never jumps or always does.
+                    self.optimized = True
+                    if bool(instruction.operands[0].value) != (instruction.opcode == IF):
+                        continue
+                    instruction = Instruction(GOTO, target=instruction.target, line=instruction.line)
                 
-                if '=' in instruction and not instruction.endswith(':'):
-                    parts = instruction.split('=', 1)
-                    if len(parts) == 2:
-                        lhs = parts[0].strip()
-                        rhs = parts[1].strip()
-                        lhs_tokens = lhs.split()
-                        var_name = lhs_tokens[-1] if lhs_tokens else ''
-                        
-                        if var_name in used_vars:
-                            rhs_vars = extract_vars_from_expr(rhs)
-                            if rhs_vars - used_vars:
-                                used_vars.update(rhs_vars)
-                                changed = True
+                value = self.fold(instruction, arrays)
+                if value is not None:
+                    instruction = Instruction(ASSIGN, dest=instruction.dest, operands=[value],
+                                              typename=instruction.typename, line=instruction.line)
+                    self.optimized = True
                 
-                if instruction.startswith('print '):
-                    expr = instruction.split('print ', 1)[1].strip()
-                    new_vars = extract_vars_from_expr(expr)
-                    if new_vars - used_vars:
-                        used_vars.update(new_vars)
-                        changed = True
+                var_name = instruction.dest
+                if var_name is not None:
+                    constants.pop(var_name, None)
+                    arrays.pop(var_name, None)
+                    if instruction.opcode == ASSIGN and type(instruction.operands[0]) is Const:
+                        constants[var_name] = instruction.operands[0]
+                    elif instruction.opcode == ARRAY and all(type(o) is Const for o in instruction.operands):
+                        arrays[var_name] = instruction.operands
                 
-                if instruction.startswith('if '):
-                    condition = instruction.split('goto')[0].replace('if', '').strip()
-                    new_vars = extract_vars_from_expr(condition)
-                    if new_vars - used_vars:
-                        used_vars.update(new_vars)
-                        changed = True
+                new_code.append(instruction)
+        
+        self.code = new_code
+
+    def known_values(self, cfg, definitions):
+        # A variable is a known constant at block entry when every definition
+        # reaching it stores the same constant (or the same constant array).
+        reaching = {}
+        for definition in definitions:
+            name, instruction = cfg.definitions[definition]
+            reaching.setdefault(name, []).append(instruction)
+        
+        constants = {}
+        arrays = {}
+        for name, instructions in reaching.items():
+            first = instructions[0]
+            if first is None:
+                continue
+            if first.opcode == ASSIGN and type(first.operands[0]) is Const:
+                if all(i is not None and i.opcode == ASSIGN and i.operands[0] == first.operands[0]
+                       for i in instructions):
+                    constants[name] = first.operands[0]
+            elif first.opcode == ARRAY and len(instructions) == 1:
+                if all(type(o) is Const for o in first.operands):
+                    arrays[name] = first.operands
+        return constants, arrays
+
+    def fold(self, instruction, arrays):
+        opcode = instruction.opcode
+        operands = instruction.operands
+        if opcode not in (BINOP, CALL, INDEX, SLICE):
+            return None
+        
+        if opcode == CALL:
+            if instruction.op not in ('length', 'size'):
+                return None
+            arg = operands[0]
+            if type(arg) is Const and isinstance(arg.value, str):
+                return Const(len(arg.value))
+            if type(arg) is Var and arg.name in arrays:
+                return Const(len(arrays[arg.name]))
+            return None
+        
+        if opcode == INDEX or opcode == SLICE:
+            base = operands[0]
+            if type(base) is Var and base.name in arrays:
+                sequence = arrays[base.name]
+            elif type(base) is Const and isinstance(base.value, str):
+                sequence = base.value
+            else:
+                return None
+            if not all(type(o) is Const and type(o.value) is int for o in operands[1:]):
+                return None
+            
+            start = operands[1].value
+            if not 0 <= start < len(sequence):
+                return None
+            if opcode == INDEX:
+                element = sequence[start]
+                return element if type(element) is Const else Const(element)
+            if isinstance(sequence, str):
+                return Const(sequence[start:operands[2].value + 1])
+            return None
         
+        left, right = operands
+        if type(left) is not Const or type(right) is not Const:
+            return None
+        if type(left.value) is not type(right.value):
+            return None
+        if isinstance(left.value, str) and instruction.op not in ('+', '<', '>', '<=', '>=', '==', '!='):
+            return None
+        if instruction.op == '/' and right.value == 0:
+            return None
+        return Const(FOLDABLE_OPERATORS[instruction.op](left.value, right.value))
+
+    def copy_propagation(self):
+        cfg = ControlFlowGraph(self.code)
+        available = cfg.available_copies()
         new_code = []
-        for instruction in self.code:
-            keep = True
+        
+        for block in cfg.blocks:
+            copies = dict(available[block.index])
             
-            if '=' in instruction and not instruction.strip().endswith(':'):
-                parts = instruction.split('=', 1)
-                if len(parts) == 2:
-                    lhs = parts[0].strip()
-                    tokens = lhs.split()
-                    var_name = tokens[-1] if tokens else ''
+            for instruction in block.instructions:
+                if copies and any(type(o) is Var and o.name in copies for o in instruction.operands):
+                    operands = [Var(copies[o.name]) if type(o) is Var and o.name in copies else o
+                                for o in instruction.operands]
+                    instruction = instruction.copy(operands=operands)
+                    self.optimized = True
+                
+                var_name = instruction.dest
+                if var_name is not None:
+                    for var, value in list(copies.items()):
+                        if var == var_name or value == var_name:
+                            del copies[var]
                     
-                    if 'iterator(' in instruction or 'next(' in instruction:
-                        keep = True
-                    elif var_name.startswith('t') and len(var_name) > 1 and var_name[1:].isdigit():
-                        keep = var_name in used_vars
-                    elif var_name and var_name in used_vars:
-                        keep = True
-                    elif var_name:
-                        if instruction.strip().startswith('string ') and ' = next(' in instruction:
-                            keep = True
-                        else:
-                            keep = False
-            
-            if keep:
+                    if instruction.opcode == ASSIGN:
+                        rhs = instruction.operands[0]
+                        if type(rhs) is Var and rhs.name != var_name:
+                            copies[var_name] = rhs.name
+                
                 new_code.append(instruction)
         
-        if len(new_code) != len(self.code):
-            self.optimized = True
         self.code = new_code
 
-    def constant_folding(self):
-        pass
-
-    def copy_propagation(self):
-        copies = {}
+    def algebraic_simplification(self):
+        kinds = self.known_kinds(ControlFlowGraph(self.code))
         new_code = []
         
         for instruction in self.code:
-            modified_instruction = instruction
-            
-            if '=' in instruction and not instruction.strip().endswith(':'):
-                parts = instruction.split('=', 1)
-                if len(parts) == 2:
-                    lhs = parts[0].strip()
-                    rhs = parts[1].strip()
-                    
-                    lhs_tokens = lhs.split()
-                    var_name = lhs_tokens[-1] if lhs_tokens else ''
-                    
-                    if rhs and not rhs.startswith('"') and not rhs.startswith('{') and '(' not in rhs and '[' not in rhs and ':' not in rhs:
-                        rhs_clean = rhs.strip()
-                        if not any(op in rhs_clean for op in [' + ', ' - ', ' * ', ' / ', ' < ', ' > ', ' <= ', ' >= ', ' == ', ' != ']):
-                            if rhs_clean.replace('_', '').replace('t', '').isalnum() or (rhs_clean.startswith('t') and len(rhs_clean) > 1 and rhs_clean[1:].isdigit()):
-                                if rhs_clean not in copies or copies[rhs_clean] != var_name:
-                                    copies[var_name] = rhs_clean
-                    if var_name in copies:
-                        del copies[var_name]
+            if instruction.opcode == BINOP:
+                value = self.simplify(instruction, kinds)
+                if value is not None:
+                    instruction = Instruction(ASSIGN, dest=instruction.dest, operands=[value],
+                                              typename=instruction.typename, line=instruction.line)
+                    self.optimized = True
+            new_code.append(instruction)
+        
+        self.code = new_code
+
+    def known_kinds(self, cfg):
+        # Maps variables that always hold an int (or always a str) to that
+        # type.  Unassigned variables read as None, and the interpreter turns
+        # None + 0 into "None0", so a variable that may be read before it is
+        # assigned has no kind, and neither does anything computed from it.
+        reaching = cfg.reaching_definitions()
+        unsafe = set()
+        for block in cfg.blocks:
+            unassigned = {cfg.definitions[d][0] for d in reaching[block.index] if cfg.definitions[d][1] is None}
+            for instruction in block.instructions:
+                unsafe.update(name for name in instruction.uses() if name in unassigned)
+                if instruction.dest is not None:
+                    unassigned.discard(instruction.dest)
+        
+        definitions = {}
+        for name, instruction in cfg.definitions.values():
+            if instruction is not None:
+                definitions.setdefault(name, []).append(instruction)
+        
+        # Guess each variable's kind from one of its definitions, then drop
+        # guesses until every definition agrees, so loop counters like
+        # i = i + 1 keep theirs.
+        kinds = {}
+        changed = True
+        while changed:
+            changed = False
+            for name, instructions in definitions.items():
+                if name in unsafe or name in kinds:
+                    continue
+                for instruction in instructions:
+                    kind = self.value_kind(instruction, kinds)
+                    if kind is not None:
+                        kinds[name] = kind
+                        changed = True
+                        break
+        
+        changed = True
+        while changed:
+            changed = False
+            for name in list(kinds):
+                if any(self.value_kind(instruction, kinds) is not kinds[name] for instruction in definitions[name]):
+                    del kinds[name]
+                    changed = True
+        return kinds
+
+    def value_kind(self, instruction, kinds):
+        opcode = instruction.opcode
+        operands = instruction.operands
+        if opcode == ASSIGN:
+            operand = operands[0]
+            if type(operand) is Const:
+                return type(operand.value)
+            return kinds.get(operand.name)
+        if opcode == CALL:
+            return int if instruction.op in ('length', 'size') else None
+        if opcode != BINOP:
+            return None
+        
+        # The interpreter's -, * and / always give ints; + concatenates as
+        # soon as either side is not an int.
+        if instruction.op in ('-', '*', '/'):
+            return int
+        if instruction.op != '+':
+            return None
+        found = [type(o.value) if type(o) is Const else kinds.get(o.name) for o in operands]
+        if str in found:
+            return str
+        if found == [int, int]:
+            return int
+        return None
+
+    def simplify(self, instruction, kinds):
+        left, right = instruction.operands
+        op = instruction.op
+        
+        def is_value(operand, value):
+            return type(operand) is Const and type(operand.value) is type(value) and operand.value == value
+        
+        def has_kind(operand, kind):
+            return type(operand) is Var and kinds.get(operand.name) is kind
+        
+        # The interpreter's -, * and / give 0 for non-int operands as well,
+        # so these hold whatever the other operand is.
+        if op == '*' and (is_value(left, 0) or is_value(right, 0)):
+            return Const(0)
+        if op == '-' and type(left) is Var and left == right:
+            return Const(0)
+        if op == '/' and is_value(left, 0):
+            return Const(0)
+        
+        if op == '+':
+            for kind, identity in ((int, 0), (str, "")):
+                if is_value(right, identity) and has_kind(left, kind):
+                    return left
+                if is_value(left, identity) and has_kind(right, kind):
+                    return right
+        if op == '*':
+            if is_value(right, 1) and has_kind(left, int):
+                return left
+            if is_value(left, 1) and has_kind(right, int):
+                return right
+        if op in ('-', '/') and is_value(right, 0 if op == '-' else 1) and has_kind(left, int):
+            return left
+        return None
+
+    def local_value_numbering(self):
+        cfg = ControlFlowGraph(self.code)
+        self.code = [instruction for block in cfg.blocks
+                     for instruction in self.number_values(block.instructions, ())]
+
+    def global_value_numbering(self):
+        # Local numbering, seeded at each block's entry with the expressions
+        # that are available along every path into it.
+        cfg = ControlFlowGraph(self.code)
+        available = cfg.available_expressions()
+        self.code = [instruction for block in cfg.blocks
+                     for instruction in self.number_values(block.instructions, available[block.index])]
+
+    def number_values(self, instructions, available):
+        # Variables holding the same value share a number; constants are
+        # their own number.  An expression whose operands have the same
+        # numbers as an earlier one is replaced by a copy of a variable that
+        # still holds that earlier result.
+        counter = itertools.count()
+        numbers = {}
+        holders = {}
+        expressions = {}
+        
+        def number(operand):
+            if type(operand) is Const:
+                return operand
+            value = numbers.get(operand.name)
+            if value is None:
+                value = numbers[operand.name] = next(counter)
+                holders[value] = [operand.name]
+            return value
+        
+        def key(expression):
+            opcode, op, operands = expression
+            values = tuple(number(o) for o in operands)
+            if op in COMMUTATIVE_OPERATORS:
+                values = tuple(sorted(values, key=repr))
+            return (opcode, op, values)
+        
+        for expression, name in sorted(available, key=repr):
+            expressions.setdefault(key(expression), number(Var(name)))
+        
+        new_code = []
+        for instruction in instructions:
+            var_name = instruction.dest
+            if var_name is None:
+                new_code.append(instruction)
+                continue
             
-            for var, value in copies.items():
-                if var in modified_instruction:
-                    import re
-                    pattern = r'\b' + re.escape(var) + r'\b'
-                    if '=' in modified_instruction:
-                        parts = modified_instruction.split('=', 1)
-                        if len(parts) == 2 and var not in parts[0] and value != parts[0].strip().split()[-1]:
-                            modified_instruction = re.sub(pattern, value, modified_instruction)
-                    else:
-                        modified_instruction = re.sub(pattern, value, modified_instruction)
+            expression = instruction.expression()
+            if expression is not None:
+                k = key(expression)
+                value = expressions.get(k)
+                if value is None:
+                    value = expressions[k] = next(counter)
+                else:
+                    holder = next((name for name in holders.get(value, ()) if name != var_name), None)
+                    if holder is not None:
+                        instruction = Instruction(ASSIGN, dest=var_name, operands=[Var(holder)],
+                                                  typename=instruction.typename, line=instruction.line)
+                        self.optimized = True
+            elif instruction.opcode == ASSIGN:
+                value = number(instruction.operands[0])
+            else:
+                value = next(counter)
             
-            new_code.append(modified_instruction)
+            previous = numbers.get(var_name)
+            if previous is not None:
+                holders[previous].remove(var_name)
+            numbers[var_name] = value
+            holders.setdefault(value, []).append(var_name)
+            new_code.append(instruction)
         
-        if new_code != self.code:
-            self.optimized = True
-        self.code = new_code
+        return new_code
 
     def remove_redundant_labels(self):
-        labels = set()
-        for instruction in self.code:
-            if instruction.strip().endswith(':'):
-                label = instruction.strip()[:-1]
-                labels.add(label)
-        
         used_labels = set()
         for instruction in self.code:
-            if 'goto' in instruction:
-                parts = instruction.split()
-                for part in parts:
-                    if part.startswith('L') and part in labels:
-                        used_labels.add(part)
+            if instruction.is_jump():
+                used_labels.add(instruction.target)
         
         new_code = []
         for instruction in self.code:
-            if instruction.strip().endswith(':'):
-                label = instruction.strip()[:-1]
-                if label in used_labels:
+            if instruction.opcode == LABEL:
+                if instruction.target in used_labels:
                     new_code.append(instruction)
                 else:
                     self.optimized = True
@@ -220,51 +519,240 @@ class Optimizer():
         self.code = new_code
 
     def remove_unreachable_code(self):
-        reachable = set()
-        labels = {}
+        cfg = ControlFlowGraph(self.code)
+        reachable = cfg.reachable()
         
-        for i, instruction in enumerate(self.code):
-            if instruction.strip().endswith(':'):
-                label = instruction.strip()[:-1]
-                labels[label] = i
-        
-        to_visit = [0]
-        while to_visit:
-            i = to_visit.pop(0)
-            if i >= len(self.code) or i in reachable:
+        new_code = []
+        for block in cfg.blocks:
+            if block.index in reachable:
+                new_code.extend(block.instructions)
+        
+        if len(new_code) != len(self.code):
+            self.optimized = True
+        self.code = new_code
+
+    def loop_invariant_code_motion(self):
+        cfg = ControlFlowGraph(self.code)
+        live_in, _ = cfg.liveness()
+        hoisted = {}
+        moved = set()
+        
+        # Outer loops go first so an invariant leaves every loop it can in
+        # one step; inner loops then only see what is left of them.
+        loops = sorted(cfg.natural_loops().items(), key=lambda loop: -len(loop[1]))
+        for header, body in loops:
+            if not self.has_preheader(cfg, header, body):
                 continue
             
-            reachable.add(i)
-            instruction = self.code[i].strip()
+            instructions = [(i, instruction) for b in sorted(body)
+                            for i, instruction in enumerate(cfg.blocks[b].instructions, cfg.blocks[b].start)
+                            if i not in moved]
+            definitions = {}
+            for i, instruction in instructions:
+                if instruction.dest is not None:
+                    definitions[instruction.dest] = definitions.get(instruction.dest, 0) + 1
+            exits = {s for b in body for s in cfg.blocks[b].successors if s not in body}
             
-            if instruction.endswith(':'):
-                if i + 1 < len(self.code):
-                    to_visit.append(i + 1)
-            elif instruction.startswith('goto '):
-                label = instruction.split('goto')[1].strip()
-                if label in labels:
-                    to_visit.append(labels[label])
-            elif instruction.startswith('if '):
-                parts = instruction.split('goto')
-                if len(parts) == 2:
-                    label = parts[1].strip()
-                    if label in labels:
-                        to_visit.append(labels[label])
-                if i + 1 < len(self.code):
-                    to_visit.append(i + 1)
-            else:
-                if i + 1 < len(self.code):
-                    to_visit.append(i + 1)
+            # A temporary is invariant when nothing it reads is assigned in
+            # the loop; hoisting one can make the temporaries using it
+            # invariant too, so scan until nothing more moves.
+            invariant = []
+            found = True
+            while found:
+                found = False
+                for i, instruction in instructions:
+                    var_name = instruction.dest
+                    if i in moved or not self.is_hoistable(instruction) or definitions.get(var_name) != 1:
+                        continue
+                    if any(name in definitions for name in instruction.uses()):
+                        continue
+                    # The hoisted value must be the only one the loop and
+                    # the code after it can observe.
+                    if var_name in live_in[header] or any(var_name in live_in[s] for s in exits):
+                        continue
+                    moved.add(i)
+                    del definitions[var_name]
+                    invariant.append(i)
+                    found = True
+            if invariant:
+                hoisted[header] = sorted(invariant)
+        
+        if not moved:
+            return
         
         new_code = []
+        for block in cfg.blocks:
+            preheader = [self.code[i] for i in hoisted.get(block.index, ())]
+            if preheader:
+                # A for-each loop's iterator setup (and its guard, once the
+                # loop is rotated) stays right above the loop body.
+                setup = []
+                if new_code and new_code[-1].is_conditional() and new_code[-1].op == 'has_next':
+                    setup.append(new_code.pop())
+                if new_code and new_code[-1].opcode == CALL and new_code[-1].op == 'iterator':
+                    setup.insert(0, new_code.pop())
+                elif setup:
+                    new_code.append(setup.pop())
+                preheader.extend(setup)
+            new_code.extend(preheader)
+            new_code.extend(instruction for i, instruction in enumerate(block.instructions, block.start)
+                            if i not in moved)
+        self.optimized = True
+        self.code = new_code
+
+    def has_preheader(self, cfg, header, body):
+        # Hoisted code is placed just before the header's label, so the loop
+        # must only be entered by falling through from the block above it.
+        outside = [b for b in cfg.blocks[header].predecessors if b not in body]
+        if header == 0:
+            return not outside
+        if outside != [header - 1]:
+            return False
+        last = cfg.blocks[header - 1].instructions[-1]
+        return not (last.is_jump() and last.target == cfg.blocks[header].label())
+
+    def is_hoistable(self, instruction):
+        # Hoisted code also runs when the loop body does not, so only
+        # temporaries the generated Python can compute without raising are
+        # moved: no indexing and no division by a possibly-zero value.
+        if instruction.dest is None or not is_temp(instruction.dest):
+            return False
+        opcode = instruction.opcode
+        if opcode == BINOP:
+            if instruction.op != '/':
+                return True
+            divisor = instruction.operands[1]
+            return type(divisor) is Const and type(divisor.value) is int and divisor.value != 0
+        if opcode == CALL:
+            return instruction.op in ('length', 'size')
+        return opcode == SLICE
+
+    def label_positions(self):
+        return {instruction.target: i for i, instruction in enumerate(self.code) if instruction.opcode == LABEL}
+
+    def falls_into(self, index, label, positions):
+        # True when only labels separate instruction index from label.
+        position = positions.get(label)
+        if position is None or position <= index:
+            return False
+        return all(self.code[i].opcode == LABEL for i in range(index + 1, position))
+
+    def jump_threading(self):
+        positions = self.label_positions()
+        
+        def final_target(label):
+            seen = set()
+            while label not in seen:
+                seen.add(label)
+                position = positions.get(label)
+                if position is None:
+                    break
+                while position < len(self.code) and self.code[position].opcode == LABEL:
+                    position += 1
+                if position == len(self.code) or self.code[position].opcode != GOTO:
+                    break
+                label = self.code[position].target
+            return label
+        
+        # Only forward targets are threaded: sending a loop exit straight to
+        # an enclosing loop's header would break the loop nesting codegen
+        # relies on.
+        threaded = []
         for i, instruction in enumerate(self.code):
-            if i in reachable:
-                new_code.append(instruction)
+            if instruction.is_jump():
+                target = final_target(instruction.target)
+                if target != instruction.target and positions.get(target, -1) > i:
+                    instruction = instruction.copy(target=target)
+                    self.optimized = True
+            threaded.append(instruction)
+        self.code = threaded
         
-        if len(new_code) != len(self.code):
-            self.optimized = True
+        # Evaluating a condition has no side effects, so conditional jumps to
+        # the next instruction go too.
+        new_code = []
+        for i, instruction in enumerate(self.code):
+            if instruction.is_jump() and self.falls_into(i, instruction.target, positions):
+                self.optimized = True
+                continue
+            new_code.append(instruction)
         self.code = new_code
 
+    def branch_inversion(self):
+        # if c goto L1; goto L2; L1:  becomes  ifFalse c goto L2; L1:
+        positions = self.label_positions()
+        new_code = []
+        i = 0
+        while i < len(self.code):
+            instruction = self.code[i]
+            if (instruction.is_conditional() and i + 1 < len(self.code)
+                    and self.code[i + 1].opcode == GOTO
+                    and self.falls_into(i + 1, instruction.target, positions)):
+                opcode = IFFALSE if instruction.opcode == IF else IF
+                new_code.append(instruction.copy(opcode=opcode, target=self.code[i + 1].target))
+                self.optimized = True
+                i += 2
+                continue
+            new_code.append(instruction)
+            i += 1
+        self.code = new_code
+
+    def loop_rotation(self):
+        # Lh: H; ifFalse c goto Le; body; goto Lh; Le:
+        # becomes
+        # Lh: H; ifFalse c goto Le; Lb: body; H; if c goto Lb; Le:
+        # so each iteration runs one conditional jump instead of two jumps.
+        jump_counts = {}
+        for instruction in self.code:
+            if instruction.is_jump():
+                jump_counts[instruction.target] = jump_counts.get(instruction.target, 0) + 1
+        positions = self.label_positions()
+        
+        rotations = {}
+        for k, instruction in enumerate(self.code):
+            if instruction.opcode != GOTO or jump_counts.get(instruction.target) != 1:
+                continue
+            start = positions.get(instruction.target)
+            if start is None or start >= k or k + 1 >= len(self.code):
+                continue
+            
+            j = start + 1
+            while j < k and self.is_header_instruction(self.code[j]):
+                j += 1
+            test = self.code[j]
+            end_label = self.code[k + 1]
+            if (j - start - 1 > MAX_ROTATED_HEADER or test.opcode != IFFALSE
+                    or end_label.opcode != LABEL or test.target != end_label.target):
+                continue
+            rotations[k] = (j, start)
+        
+        if not rotations:
+            return
+        
+        label_count = 1 + max((int(label[1:]) for label in positions if label[1:].isdigit()), default=-1)
+        tests = {j for j, start in rotations.values()}
+        body_labels = {}
+        new_code = []
+        for k, instruction in enumerate(self.code):
+            if k in rotations:
+                j, start = rotations[k]
+                new_code.extend(self.code[start + 1:j])
+                test = self.code[j]
+                new_code.append(test.copy(opcode=IF, target=body_labels.pop(j), line=instruction.line))
+                continue
+            new_code.append(instruction)
+            if k in tests:
+                label = f"L{label_count}"
+                label_count += 1
+                body_labels[k] = label
+                new_code.append(Instruction(LABEL, target=label, line=instruction.line))
+        
+        self.optimized = True
+        self.code = new_code
+
+    def is_header_instruction(self, instruction):
+        return (instruction.dest is not None and is_temp(instruction.dest)
+                and not instruction.has_side_effects())
+
     def print_optimized_code(self):
         print("\n=== Optimized Intermediate Code ===")
         for i, instruction in enumerate(self.code):
@@ -273,26 +761,3 @@ class Optimizer():
 
     def get_code(self):
         return self.code
-
-    def peephole_optimization(self):
-        new_code = []
-        i = 0
-        
-        while i < len(self.code):
-            if i < len(self.code) - 1:
-                curr = self.code[i].strip()
-                next_instr = self.code[i + 1].strip()
-                
-                if curr.startswith('goto ') and next_instr.endswith(':'):
-                    label = curr.split()[1]
-                    next_label = next_instr[:-1]
-                    if label == next_label:
-                        i += 1
-                        continue
-            
-            new_code.append(self.code[i])
-            i += 1
-        
-        if len(new_code) != len(self.code):
-            self.optimized = True
-        self.code = new_code
\ No newline at end of file
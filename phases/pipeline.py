@@ -0,0 +1,188 @@
+import io
+from contextlib import redirect_stdout
+
+from .lexical import default_lexer
+from .syntax import SyntaxAnalysis
+from .semantic import SemanticAnalysis
+from .intermediate import IntermediateCode
+from .optimizer import DEFAULT_LEVEL, Optimizer
+from .codegen import CodeGenerator
+from .interpreter import Interpreter
+from .executor import PythonExecutor
+from .closures import ClosureCompiler
+from .instrument import count_nodes, measure
+from .profiler import Profiler
+from .diagnostics import format_diagnostics
+
+BACKENDS = ("interpreter", "python", "closure")
+
+# Where the language defines a result but Python raises: division by zero
+# gives 0, arithmetic and comparisons on mixed or missing values have
+# defined results, and unassigned variables read as None.  Generated Python
+# that raises one of these is rerun by the interpreter; anything else is a
+# compiler bug and is reported as an error.
+FALLBACK_ERRORS = (ZeroDivisionError, TypeError, NameError)
+
+
+class Compilation():
+
+    def __init__(self, source, name="<string>"):
+        self.source = source
+        self.name = name
+        self.tokens = None
+        self.tree = None
+        self.symbol_table = None
+        self.intermediate = None
+        self.optimized = None
+        self.python_code = None
+        self.output = None
+        self.error = None
+        self.fallback = None
+        self.diagnostics = []
+        self.cached = False
+        self.phases = []
+        self.profile = None
+        self.passes = []
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def compile_source(source, name="<string>", generate=True, run=False, lexer=default_lexer, cache=None,
+                   backend="interpreter", instrument=None, profile=False, opt_level=DEFAULT_LEVEL, keep_tokens=False):
+    result = Compilation(source, name)
+    if instrument is not None:
+        first_record = len(instrument.records)
+    if run and backend == "python":
+        generate = True
+    # The closure engine runs straight from the tree, so a plain run needs
+    # neither the IR nor the cache.
+    direct = run and backend == "closure" and not generate and not profile
+    # Profiles are per IR instruction, so profiled runs always use the
+    # interpreter.
+    profiler = Profiler() if run and profile else None
+    if profiler is not None:
+        backend = "interpreter"
+
+    try:
+        if cache is not None and not direct:
+            with measure(instrument, "cache") as record:
+                entry = cache.get(source, f"O{opt_level}")
+                record.items["hits"] = int(entry is not None)
+            if entry is not None:
+                result.optimized, result.python_code = entry
+                result.cached = True
+                if run:
+                    with measure(instrument, "execute") as record:
+                        result.output = run_code(result.optimized, result.python_code, backend, record, profiler,
+                                                 result)
+                        result.profile = profiler and profiler.as_dict()
+                return result
+            # Cached entries always carry the generated Python.
+            generate = True
+
+        if keep_tokens or instrument is not None:
+            with measure(instrument, "lex") as record:
+                result.tokens = list(lexer.tokenize(source))
+                record.items["tokens"] = len(result.tokens)
+            tokens = result.tokens
+        else:
+            # The parser pulls tokens from the lexer as it goes, so the
+            # whole list is only built when it is kept or lexing is timed.
+            tokens = lexer.tokenize(source)
+
+        with measure(instrument, "parse") as record:
+            parser = SyntaxAnalysis(tokens)
+            result.tree = parser.parse_program()
+            if instrument is not None:
+                record.items["nodes"] = count_nodes(result.tree)
+        if parser.errors:
+            result.diagnostics = parser.errors
+            raise SyntaxError(format_diagnostics(parser.errors))
+
+        with measure(instrument, "analyze") as record:
+            sem = SemanticAnalysis()
+            sem.analyze(result.tree)
+            result.symbol_table = sem.symbol_table
+            record.items["symbols"] = len(result.symbol_table)
+        if sem.errors:
+            result.diagnostics = sem.errors
+            raise Exception(format_diagnostics(sem.errors))
+
+        if direct:
+            with measure(instrument, "execute") as record:
+                result.output = run_tree(result.tree)
+            return result
+
+        with measure(instrument, "generate") as record:
+            ic = IntermediateCode()
+            ic.generate(result.tree)
+            result.intermediate = ic.get_code()
+            record.items["instructions"] = len(result.intermediate)
+
+        with measure(instrument, "optimize") as record:
+            optimizer = Optimizer(result.intermediate, level=opt_level)
+            result.optimized = optimizer.optimize()
+            result.passes = list(optimizer.stats.values())
+            record.items["instructions"] = len(result.optimized)
+            record.items["iterations"] = optimizer.iterations
+        if generate:
+            with measure(instrument, "codegen") as record:
+                result.python_code = CodeGenerator(result.optimized).generate()
+                record.items["lines"] = result.python_code.count("\n") + 1
+
+        if cache is not None:
+            cache.put(source, result.optimized, result.python_code, f"O{opt_level}")
+
+        if run:
+            with measure(instrument, "execute") as record:
+                if backend == "closure":
+                    result.output = run_tree(result.tree)
+                else:
+                    result.output = run_code(result.optimized, result.python_code, backend, record, profiler,
+                                             result)
+                    result.profile = profiler and profiler.as_dict()
+    except Exception as e:
+        # Every diagnostic of the failing phase gets its own line.
+        if result.diagnostics:
+            result.error = "\n".join(f"{type(e).__name__}: {d}" for d in result.diagnostics)
+        else:
+            result.error = f"{type(e).__name__}: {e}"
+    finally:
+        if instrument is not None:
+            result.phases = instrument.records[first_record:]
+    return result
+
+
+def run_code(optimized_code, python_code=None, backend="interpreter", record=None, profiler=None, result=None):
+    if backend == "python" and python_code is not None:
+        try:
+            return PythonExecutor(python_code).run()
+        except FALLBACK_ERRORS as e:
+            # The interpreter defines the language's behaviour; the result
+            # notes that it, not the generated Python, produced the output.
+            if result is not None:
+                result.fallback = f"{type(e).__name__}: {e}"
+            if record is not None:
+                record.items["fallback"] = 1
+
+    interpreter = Interpreter(optimized_code)
+    interpreter.compile()
+
+    output = io.StringIO()
+    with redirect_stdout(output):
+        interpreter.run(profiler)
+    if record is not None:
+        record.items["instructions"] = interpreter.steps
+    return output.getvalue()
+
+
+def run_tree(tree):
+    engine = ClosureCompiler(tree)
+    engine.compile()
+
+    output = io.StringIO()
+    with redirect_stdout(output):
+        engine.run()
+    return output.getvalue()
@@ -0,0 +1,107 @@
+from .interpreter import JUMP_OPCODES
+
+
+class Profiler():
+
+    def __init__(self):
+        self.counts = []
+        self.times = []
+        self.intermediate_code = []
+        self.positions = []
+        self.bytecode = []
+
+    def start(self, interpreter):
+        size = len(interpreter.bytecode)
+        self.counts = [0] * size
+        self.times = [0.0] * size
+        self.intermediate_code = interpreter.intermediate_code
+        self.positions = interpreter.positions
+        self.bytecode = interpreter.bytecode
+
+    def instructions(self):
+        rows = []
+        for pc, count in enumerate(self.counts):
+            if not count:
+                continue
+            index = self.positions[pc]
+            instruction = self.intermediate_code[index]
+            rows.append({
+                "index": index + 1,
+                "instruction": str(instruction),
+                "line": instruction.line,
+                "count": count,
+                "time": self.times[pc],
+            })
+        rows.sort(key=lambda row: row["time"], reverse=True)
+        return rows
+
+    def lines(self):
+        totals = {}
+        for row in self.instructions():
+            line = totals.setdefault(row["line"], {"line": row["line"], "count": 0, "time": 0.0})
+            line["count"] += row["count"]
+            line["time"] += row["time"]
+        return sorted(totals.values(), key=lambda line: line["time"], reverse=True)
+
+    def loops(self):
+        # A loop is the bytecode range closed by a backward jump; its time is
+        # inclusive of any loops nested inside it.
+        rows = []
+        for pc, (op, target, _, _, _) in enumerate(self.bytecode):
+            if op not in JUMP_OPCODES or target > pc:
+                continue
+            instruction = self.intermediate_code[self.positions[pc]]
+            rows.append({
+                "line": instruction.line,
+                "start": self.positions[target] + 1,
+                "end": self.positions[pc] + 1,
+                "iterations": self.counts[pc],
+                "time": sum(self.times[target:pc + 1]),
+            })
+        rows.sort(key=lambda row: row["time"], reverse=True)
+        return rows
+
+    def as_dict(self):
+        return {
+            "total_time": sum(self.times),
+            "instructions_executed": sum(self.counts),
+            "instructions": self.instructions(),
+            "lines": self.lines(),
+            "loops": self.loops(),
+        }
+
+
+def format_profile(profile, source=None, limit=10):
+    total = profile["total_time"] or 1.0
+    source_lines = source.splitlines() if source else []
+
+    def line_text(line):
+        if line is None or not 0 < line <= len(source_lines):
+            return ""
+        return source_lines[line - 1].strip()
+
+    def line_label(line):
+        return f"{line:>5}" if line is not None else f"{'?':>5}"
+
+    output = [f"Executed {profile['instructions_executed']} instructions "
+              f"in {profile['total_time'] * 1000:.2f}ms"]
+
+    output.append("\nHot loops:")
+    output.append(f"{'line':>5} {'iterations':>10} {'time':>10} {'%':>6}  source")
+    for row in profile["loops"][:limit]:
+        output.append(f"{line_label(row['line'])} {row['iterations']:>10} {row['time'] * 1000:>8.2f}ms "
+                      f"{row['time'] / total * 100:>5.1f}%  {line_text(row['line'])}")
+
+    output.append("\nHot lines:")
+    output.append(f"{'line':>5} {'count':>10} {'time':>10} {'%':>6}  source")
+    for row in profile["lines"][:limit]:
+        output.append(f"{line_label(row['line'])} {row['count']:>10} {row['time'] * 1000:>8.2f}ms "
+                      f"{row['time'] / total * 100:>5.1f}%  {line_text(row['line'])}")
+
+    output.append("\nHot instructions:")
+    output.append(f"{'#':>5} {'line':>5} {'count':>10} {'time':>10} {'%':>6}  instruction")
+    for row in profile["instructions"][:limit]:
+        output.append(f"{row['index']:>5} {line_label(row['line'])} {row['count']:>10} "
+                      f"{row['time'] * 1000:>8.2f}ms {row['time'] / total * 100:>5.1f}%  {row['instruction']}")
+
+    return "\n".join(output)
@@ -3,9 +3,12 @@ from .syntax import (
     StringLiteral, IntLiteral, ArrayLiteral, SliceExpr, ForEachLoop,
     WhileLoop, BinaryOp, ArrayAccess, FunctionCall
 )
+from .visitor import NodeVisitor, operator_chain
+from .diagnostics import Diagnostic
 
 
-class SemanticAnalysis():
+class SemanticAnalysis(NodeVisitor):
+    prefix = "analyze_"
 
     def __init__(self):
         self.symbol_table = {}
@@ -13,32 +16,42 @@ class SemanticAnalysis():
             'length': 'function',
             'size': 'function'
         }
+        self.errors = []
 
-    def analyze(self, node):
-        method_name = f"analyze_{type(node).__name__}"
-        method = getattr(self, method_name, self.generic_analyze)
-        return method(node)
+    analyze = NodeVisitor.visit
 
-    def generic_analyze(self, node):
-        raise Exception(f"No analyze_{type(node).__name__} method defined")
+    def record(self, node, error):
+        self.errors.append(Diagnostic(str(error), node.line))
+
+    def analyze_statements(self, statements):
+        # Errors are collected per statement: the first one found in a
+        # statement is recorded and analysis moves on to the next.
+        for stmt in statements:
+            try:
+                self.analyze(stmt)
+            except Exception as e:
+                self.record(stmt, e)
 
     def analyze_Program(self, node):
-        for stmt in node.statements:
-            self.analyze(stmt)
+        self.analyze_statements(node.statements)
 
     def analyze_Declaration(self, node):
         if node.name in self.symbol_table:
             raise Exception(f"Semantic Error: Variable '{node.name}' already declared")
         
-        expr_type = self.analyze(node.expression)
+        try:
+            expr_type = self.analyze(node.expression)
+        finally:
+            # Declared even when the initializer is wrong, so later uses
+            # of the variable don't report errors of their own.
+            if node.typename in ("string", "int", "array"):
+                self.symbol_table[node.name] = node.typename
         
         if node.typename not in ("string", "int", "array"):
             raise Exception(f"Semantic Error: Invalid type '{node.typename}'")
         
         if node.typename != expr_type:
             raise Exception(f"Type Error: Cannot assign {expr_type} to {node.typename}")
-        
-        self.symbol_table[node.name] = node.typename
 
     def analyze_Assignment(self, node):
         if node.name not in self.symbol_table:
@@ -101,34 +114,43 @@ class SemanticAnalysis():
         return var_type
 
     def analyze_ForEachLoop(self, node):
+        # A bad loop header is recorded and the body is still analyzed.
         if node.iterable not in self.symbol_table:
-            raise Exception(f"Semantic Error: Variable '{node.iterable}' not declared")
-        iter_type = self.symbol_table[node.iterable]
-        if iter_type not in ("string", "array"):
-            raise Exception(f"Semantic Error: Cannot iterate over type '{iter_type}'")
-        if node.var in self.symbol_table:
-            raise Exception(f"Semantic Error: Loop variable '{node.var}' already declared")
+            self.record(node, f"Semantic Error: Variable '{node.iterable}' not declared")
+        elif self.symbol_table[node.iterable] not in ("string", "array"):
+            self.record(node, f"Semantic Error: Cannot iterate over type '{self.symbol_table[node.iterable]}'")
         
-        self.symbol_table[node.var] = "string"
+        declared = node.var in self.symbol_table
+        if declared:
+            self.record(node, f"Semantic Error: Loop variable '{node.var}' already declared")
+        else:
+            self.symbol_table[node.var] = "string"
 
-        for stmt in node.body:
-            self.analyze(stmt)
+        self.analyze_statements(node.body)
         
-        self.symbol_table.pop(node.var)
+        if not declared:
+            self.symbol_table.pop(node.var)
 
     def analyze_WhileLoop(self, node):
-        condition_type = self.analyze(node.condition)
+        try:
+            condition_type = self.analyze(node.condition)
+            if condition_type not in ("int", "boolean"):
+                raise Exception(f"Type Error: While condition must be boolean or int, got {condition_type}")
+        except Exception as e:
+            self.record(node, e)
         
-        if condition_type not in ("int", "boolean"):
-            raise Exception(f"Type Error: While condition must be boolean or int, got {condition_type}")
-        
-        for stmt in node.body:
-            self.analyze(stmt)
+        self.analyze_statements(node.body)
 
     def analyze_BinaryOp(self, node):
-        left_type = self.analyze(node.left)
-        right_type = self.analyze(node.right)
-        
+        # Long operator chains are folded left to right in a loop rather
+        # than by recursing into node.left.
+        operand, chain = operator_chain(node)
+        left_type = self.analyze(operand)
+        for binary in chain:
+            left_type = self.binary_type(binary, left_type, self.analyze(binary.right))
+        return left_type
+
+    def binary_type(self, node, left_type, right_type):
         if node.operator == '+':
             if left_type == "string" and right_type == "string":
                 return "string"
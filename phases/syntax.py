@@ -1,114 +1,275 @@
-class Program:
+from collections import deque
+
+from .diagnostics import Diagnostic
+
+class Node:
+    # Nodes are slotted: value_fields name the attributes holding names,
+    # operators and literal values, child_fields the ones holding nodes or
+    # lists of nodes, in evaluation order.
+    __slots__ = ()
+    value_fields = ()
+    child_fields = ()
+    line = None
+
+    def children(self):
+        for field in self.child_fields:
+            value = getattr(self, field)
+            if type(value) is list:
+                yield from value
+            else:
+                yield value
+
+    def values(self):
+        return [(field, getattr(self, field)) for field in self.value_fields]
+
+class Statement(Node):
+    # Statements remember the source line they start on.
+    __slots__ = ('line',)
+
+class Program(Node):
+    __slots__ = ('statements',)
+    child_fields = ('statements',)
+
     def __init__(self, statements):
         self.statements = statements
 
-class Declaration:
+class Declaration(Statement):
+    __slots__ = ('typename', 'name', 'expression')
+    value_fields = ('typename', 'name')
+    child_fields = ('expression',)
+
     def __init__(self, typename, name, expression):
         self.typename = typename
         self.name = name
         self.expression = expression
+        self.line = None
+
+class Assignment(Statement):
+    __slots__ = ('name', 'expression')
+    value_fields = ('name',)
+    child_fields = ('expression',)
 
-class Assignment:
     def __init__(self, name, expression):
         self.name = name
         self.expression = expression
+        self.line = None
+
+class Print(Statement):
+    __slots__ = ('printable',)
+    child_fields = ('printable',)
 
-class Print:
     def __init__(self, printable):
         self.printable = printable
+        self.line = None
+
+class Identifier(Node):
+    __slots__ = ('name',)
+    value_fields = ('name',)
 
-class Identifier:
     def __init__(self, name):
         self.name = name
 
-class StringLiteral:
+class StringLiteral(Node):
+    __slots__ = ('value',)
+    value_fields = ('value',)
+
     def __init__(self, value):
         self.value = value
 
-class IntLiteral:
+class IntLiteral(Node):
+    __slots__ = ('value',)
+    value_fields = ('value',)
+
     def __init__(self, value):
         self.value = int(value)
 
-class ArrayLiteral:
+class ArrayLiteral(Node):
+    __slots__ = ('elements',)
+    child_fields = ('elements',)
+
     def __init__(self, elements):
         self.elements = elements
 
-class SliceExpr:
+class SliceExpr(Node):
+    __slots__ = ('name', 'start', 'end')
+    value_fields = ('name',)
+    child_fields = ('start', 'end')
+
     def __init__(self, name, start, end):
         self.name = name
         self.start = start
         self.end = end
 
-class ForEachLoop:
+class ForEachLoop(Statement):
+    __slots__ = ('var', 'iterable', 'body')
+    value_fields = ('var', 'iterable')
+    child_fields = ('body',)
+
     def __init__(self, var, iterable, body):
         self.var = var
         self.iterable = iterable
         self.body = body
+        self.line = None
+
+class WhileLoop(Statement):
+    __slots__ = ('condition', 'body')
+    child_fields = ('condition', 'body')
 
-class WhileLoop:
     def __init__(self, condition, body):
         self.condition = condition
         self.body = body
+        self.line = None
+
+class BinaryOp(Node):
+    __slots__ = ('left', 'operator', 'right')
+    value_fields = ('operator',)
+    child_fields = ('left', 'right')
 
-class BinaryOp:
     def __init__(self, left, operator, right):
         self.left = left
         self.operator = operator
         self.right = right
 
-class ArrayAccess:
+class ArrayAccess(Node):
+    __slots__ = ('name', 'index')
+    value_fields = ('name',)
+    child_fields = ('index',)
+
     def __init__(self, name, index):
         self.name = name
         self.index = index
 
-class FunctionCall:
+class FunctionCall(Node):
+    __slots__ = ('name', 'arguments')
+    value_fields = ('name',)
+    child_fields = ('arguments',)
+
     def __init__(self, name, arguments):
         self.name = name
         self.arguments = arguments
 
+# Binding strength of every binary operator token; all of them are left
+# associative.  Comparisons bind loosest, as in C.
+BINARY_PRECEDENCE = {
+    "EQ": 1, "NEQ": 1,
+    "LT": 2, "GT": 2, "LE": 2, "GE": 2,
+    "PLUS": 3, "MINUS": 3,
+    "MUL": 4, "DIV": 4,
+}
+
+# Keywords that begin a statement; error recovery resumes at them.
+STATEMENT_KEYWORDS = ("int", "string", "array", "for", "while")
+
 class SyntaxAnalysis():
     
     def __init__(self, tokens):
-        self.tokens = tokens
+        self.tokens = iter(tokens)
+        self.buffer = deque()
         self.pos = 0
+        self.errors = []
+    
+    def fill(self, count):
+        while len(self.buffer) < count:
+            token = next(self.tokens, None)
+            if token is None:
+                return False
+            self.buffer.append(token)
+        return True
     
     def current(self):
-        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+        return self.buffer[0] if self.buffer or self.fill(1) else None
     
     def peek(self, offset=1):
-        pos = self.pos + offset
-        return self.tokens[pos] if pos < len(self.tokens) else None
+        return self.buffer[offset] if self.fill(offset + 1) else None
+    
+    def advance(self):
+        self.buffer.popleft()
+        self.pos += 1
+    
+    def error(self, message):
+        # Records a diagnostic at the current token and returns the exception
+        # that abandons the statement being parsed.
+        token = self.current()
+        if token is None:
+            diagnostic = Diagnostic(f"{message}, found end of input")
+        elif len(token) > 3:
+            diagnostic = Diagnostic(message, token[2], token[3])
+        else:
+            diagnostic = Diagnostic(f"{message} at position {self.pos}")
+        self.errors.append(diagnostic)
+        return SyntaxError(str(diagnostic))
     
     def match(self, *expected):
         token = self.current()
         if token and token[0] in expected:
-            self.pos += 1
+            self.advance()
             return token
         return None
 
     def expect(self, expected):
         token = self.match(expected)
         if not token:
-            raise SyntaxError(f"Expected {expected} at position {self.pos}")
+            raise self.error(f"Expected {expected}")
         return token
     
     def parse_program(self):
+        # Always returns a Program, holding every statement that parsed;
+        # what went wrong in the others is in self.errors.
+        return Program(self.parse_statements())
+    
+    def parse_statements(self, closing=None):
         statements = []
+        while self.current() and self.current()[0] != closing:
+            start = self.pos
+            try:
+                statements.append(self.parse_statement())
+            except SyntaxError:
+                self.synchronize(start)
+        return statements
+    
+    def synchronize(self, start):
+        # Panic mode: skip the rest of the broken statement, up to and
+        # including its `;` or the `}` closing its own block, or up to the
+        # next statement keyword or the `}` closing the enclosing block.
+        # Always skips at least one token so parsing makes progress.
+        depth = 0
         while self.current():
-            statements.append(self.parse_statement())
-        return Program(statements)
+            token = self.current()
+            moved = self.pos > start
+            if depth == 0 and moved and (token[0] == "COUT" or token[0] == "KEYWORD" and token[1] in STATEMENT_KEYWORDS):
+                return
+            if token[0] == "RBRACE":
+                if depth == 0 and moved:
+                    return
+                depth = max(depth - 1, 0)
+                self.advance()
+                if depth == 0:
+                    return
+                continue
+            self.advance()
+            if token[0] == "LBRACE":
+                depth += 1
+            elif token[0] == "SEMICOLON" and depth == 0:
+                return
     
     def parse_statement(self):
-        if self.current()[0] == "KEYWORD":
-            if self.current()[1] == "for":
-                return self.parse_for_loop()
-            elif self.current()[1] == "while":
-                return self.parse_while_loop()
-            return self.parse_declaration()
-        elif self.current()[0] == "COUT":
-            return self.parse_print()
+        token = self.current()
+        if token[0] == "KEYWORD":
+            if token[1] == "for":
+                statement = self.parse_for_loop()
+            elif token[1] == "while":
+                statement = self.parse_while_loop()
+            else:
+                statement = self.parse_declaration()
+        elif token[0] == "COUT":
+            statement = self.parse_print()
         else:
-            return self.parse_assignment()
+            statement = self.parse_assignment()
+        
+        # Statements remember where they start so later phases can map
+        # instructions back to source lines.
+        statement.line = token[2] if len(token) > 3 else None
+        return statement
     
     def parse_declaration(self):
         typename = self.expect("KEYWORD")[1]  
@@ -133,67 +294,63 @@ class SyntaxAnalysis():
         return Print(printable)
 
     def parse_printable(self):
-        if self.current()[0] == "IDENTIFIER":
+        # Slices are only allowed as a printed operand, so they are parsed
+        # here rather than in parse_factor.
+        token = self.current()
+        following = self.peek()
+        if token and token[0] == "IDENTIFIER" and following and following[0] == "LBRACKET":
             ident = self.expect("IDENTIFIER")[1]
-            if self.match("LBRACKET"):
-                start_expr = self.parse_expression()
-                
-                if self.match("COLON"):
-                    end_expr = self.parse_expression()
-                    self.expect("RBRACKET")
-                    return SliceExpr(ident, start_expr, end_expr)
-                else:
-                    self.expect("RBRACKET")
-                    return ArrayAccess(ident, start_expr)
-            return Identifier(ident)
-        elif self.current()[0] == "STRING_LITERAL":
-            return StringLiteral(self.expect("STRING_LITERAL")[1])
-        elif self.current()[0] == "NUMBER":
-            return IntLiteral(self.expect("NUMBER")[1])
-        else:
-            return self.parse_expression()
+            self.expect("LBRACKET")
+            start_expr = self.parse_expression()
+            if self.match("COLON"):
+                end_expr = self.parse_expression()
+                self.expect("RBRACKET")
+                return self.parse_operators(SliceExpr(ident, start_expr, end_expr))
+            self.expect("RBRACKET")
+            return self.parse_operators(ArrayAccess(ident, start_expr))
+        return self.parse_expression()
 
     def parse_expression(self):
-        left = self.parse_term()
-        
-        while self.current() and self.current()[0] == "PLUS":
-            op = self.match("PLUS")[1]
-            right = self.parse_term()
-            left = BinaryOp(left, op, right)
-        
-        while self.current() and self.current()[0] == "MINUS":
-            op = self.match("MINUS")[1]
-            right = self.parse_term()
-            left = BinaryOp(left, op, right)
-        
-        return left
+        return self.parse_operators(self.parse_factor())
 
-    def parse_term(self):
-        left = self.parse_factor()
-        
-        while self.current() and self.current()[0] in ("MUL", "DIV"):
-            op = self.current()[1]
-            self.pos += 1
+    def parse_operators(self, left, min_precedence=1):
+        # Precedence climbing: operators of one level are folded in a loop,
+        # so a flat chain like a + b + c + ... never recurses; only a tighter
+        # operator on the right starts a nested call, at most one per level.
+        while True:
+            operator = self.current()
+            precedence = BINARY_PRECEDENCE.get(operator[0]) if operator else None
+            if precedence is None or precedence < min_precedence:
+                return left
+            self.advance()
             right = self.parse_factor()
-            left = BinaryOp(left, op, right)
-        
-        return left
+            
+            token = self.current()
+            while token and BINARY_PRECEDENCE.get(token[0], 0) > precedence:
+                right = self.parse_operators(right, precedence + 1)
+                token = self.current()
+            left = BinaryOp(left, operator[1], right)
 
     def parse_factor(self):
-        if self.current()[0] == "STRING_LITERAL":
-            return StringLiteral(self.match("STRING_LITERAL")[1])
-        elif self.current()[0] == "NUMBER":
-            return IntLiteral(self.match("NUMBER")[1])
-        elif self.current()[0] == "IDENTIFIER":
-            name = self.match("IDENTIFIER")[1]
+        token = self.current()
+        kind = token[0] if token else None
+        if kind == "STRING_LITERAL":
+            self.advance()
+            return StringLiteral(token[1])
+        elif kind == "NUMBER":
+            self.advance()
+            return IntLiteral(token[1])
+        elif kind == "IDENTIFIER":
+            self.advance()
+            name = token[1]
             
             if self.match("LPAREN"):
                 args = []
-                if self.current()[0] != "RPAREN":
+                if not self.match("RPAREN"):
                     args.append(self.parse_expression())
                     while self.match("COMMA"):
                         args.append(self.parse_expression())
-                self.expect("RPAREN")
+                    self.expect("RPAREN")
                 return FunctionCall(name, args)
             
             elif self.match("LBRACKET"):
@@ -202,19 +359,20 @@ class SyntaxAnalysis():
                 return ArrayAccess(name, index_expr)
             
             return Identifier(name)
-        elif self.current()[0] == "LBRACE":
+        elif kind == "LBRACE":
             return self.parse_array_literal()
-        elif self.match("LPAREN"):
+        elif kind == "LPAREN":
+            self.advance()
             expr = self.parse_expression()
             self.expect("RPAREN")
             return expr
         else:
-            raise SyntaxError(f"Invalid expression at position {self.pos}")
+            raise self.error("Invalid expression")
 
     def parse_array_literal(self):
         elements = []
         self.expect("LBRACE")
-        if self.current()[0] != "RBRACE":
+        if self.current() and self.current()[0] != "RBRACE":
             elements.append(self.parse_expression())
             while self.match("COMMA"):
                 elements.append(self.parse_expression())
@@ -230,34 +388,17 @@ class SyntaxAnalysis():
         self.expect("RPAREN")
         self.expect("LBRACE")
 
-        body = []
-        while self.current() and self.current()[0] != "RBRACE":
-            body.append(self.parse_statement())
-
+        body = self.parse_statements("RBRACE")
         self.expect("RBRACE")
         return ForEachLoop(loop_var, iterable, body)
 
     def parse_while_loop(self):
         self.expect("KEYWORD")
         self.expect("LPAREN")
-        condition = self.parse_condition()
+        condition = self.parse_expression()
         self.expect("RPAREN")
         self.expect("LBRACE")
 
-        body = []
-        while self.current() and self.current()[0] != "RBRACE":
-            body.append(self.parse_statement())
-
+        body = self.parse_statements("RBRACE")
         self.expect("RBRACE")
         return WhileLoop(condition, body)
-
-    def parse_condition(self):
-        left = self.parse_expression()
-        
-        if self.current() and self.current()[0] in ("LT", "GT", "LE", "GE", "EQ", "NEQ"):
-            op = self.current()[1]
-            self.pos += 1
-            right = self.parse_expression()
-            return BinaryOp(left, op, right)
-        
-        return left
\ No newline at end of file
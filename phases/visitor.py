@@ -0,0 +1,58 @@
+from .syntax import Node, BinaryOp
+
+
+def node_types(base=Node):
+    types = []
+    stack = [base]
+    while stack:
+        cls = stack.pop()
+        types.append(cls)
+        stack.extend(cls.__subclasses__())
+    return types
+
+
+class NodeVisitor():
+    # Handlers are methods named prefix + node class name.  Each subclass
+    # maps node classes to its handlers once, when the class is created, so
+    # visiting a node is a single dictionary lookup.
+    prefix = "visit_"
+    dispatch = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.dispatch = {}
+        for node_type in node_types():
+            method = getattr(cls, cls.prefix + node_type.__name__, None)
+            if method is not None:
+                cls.dispatch[node_type] = method
+
+    def visit(self, node):
+        method = self.dispatch.get(type(node))
+        if method is None:
+            return self.generic_visit(node)
+        return method(self, node)
+
+    def generic_visit(self, node):
+        raise Exception(f"No {self.prefix}{type(node).__name__} method defined")
+
+
+def walk(node):
+    # Pre-order (node, depth) pairs from an explicit stack, so arbitrarily
+    # deep trees never touch the recursion limit.
+    stack = [(node, 0)]
+    while stack:
+        node, depth = stack.pop()
+        yield node, depth
+        stack.extend((child, depth + 1) for child in reversed(list(node.children())))
+
+
+def operator_chain(node):
+    # `a + b - c` parses as ((a + b) - c): returns a and the operations from
+    # the innermost outwards, so visitors can fold long chains in a loop
+    # instead of recursing once per operator.
+    chain = []
+    while type(node) is BinaryOp:
+        chain.append(node)
+        node = node.left
+    chain.reverse()
+    return node, chain
@@ -0,0 +1,172 @@
+import builtins
+import io
+from contextlib import redirect_stdout
+
+import pytest
+
+from phases.__main__ import main
+from phases.pipeline import BACKENDS, compile_source, run_code
+from phases.optimizer import OPTIMIZATION_LEVELS
+
+PROGRAMS = {
+    "slicing": '''
+array arr = {"A", "B", "C", "D"};
+cout << arr[1:3];
+string message = "Hello World";
+cout << message[0:4];
+''',
+    "negative_index": '''
+array xs = {"a", "b", "c"};
+cout << xs[0-1];
+string s = "hello";
+cout << s[5:6];
+''',
+    "out_of_range": '''
+array xs = {"a", "b", "c"};
+cout << xs[0-1];
+cout << xs[3];
+int i = 0 - 2;
+cout << xs[i];
+string s = "hello";
+cout << s[5:6];
+cout << s[0-1:2];
+cout << s[1:3];
+cout << s[2:100];
+int start = 5;
+int stop = 6;
+cout << s[start:stop];
+''',
+    "loops": '''
+array xs = {"a", "b"};
+array ys = {"1", "2", "3"};
+int n = 0;
+for (x in xs) {
+    for (y in ys) {
+        string xy = x + y;
+        cout << xy;
+        n = n + 1;
+    }
+}
+cout << n;
+int i = 0;
+while (i < size(ys)) {
+    int j = 0;
+    while (j < 2) {
+        cout << ys[i];
+        j = j + 1;
+    }
+    i = i + 1;
+}
+''',
+    "arithmetic": '''
+int k = 2 * 3 + 4;
+string s = "ab" + "cd";
+int l = length("hello");
+int q = 7 / 2;
+cout << k - 1;
+cout << s;
+cout << l;
+cout << q;
+int total = 0;
+int i = 0;
+while (i < 20) {
+    total = total + i * 3 - i / 2;
+    i = i + 1;
+}
+cout << total;
+cout << 10 - 4 - 3;
+cout << 2 * (3 + 4);
+''',
+    "invariants": '''
+int a = 3;
+int b = 4;
+int i = 0;
+int zero = 0;
+while (i < zero) {
+    int c = a * b + 1;
+    cout << c;
+    i = i + 1;
+}
+while (i < 3) {
+    int d = a * b + i;
+    cout << d;
+    i = i + 1;
+}
+''',
+    "strings": '''
+array names = {"Alice", "Bob", "Charlie"};
+string line = "";
+for (name in names) {
+    line = line + name[0] + ",";
+    cout << length(name);
+}
+cout << line;
+cout << line == "A,B,C,";
+cout << size(names) != 3;
+''',
+    "runtime_cases": '''
+int zero = 0;
+cout << 7 / zero;
+cout << "after";
+''',
+    "reserved_names": '''
+string index = "i";
+string slice = "s";
+string len = "l";
+string print_ = "p";
+cout << index + slice + len + print_;
+''',
+}
+
+
+def run(source, backend, opt_level):
+    result = compile_source(source, run=True, backend=backend, opt_level=opt_level)
+    assert result.ok, result.error
+    return result
+
+
+# Programs whose generated Python raises where the language defines a
+# result, so the Python backend has to hand them to the interpreter.
+FALLBACK_PROGRAMS = ("runtime_cases",)
+
+
+@pytest.mark.parametrize("name", sorted(PROGRAMS))
+def test_backends_agree(name):
+    # The interpreter without optimization defines the language's behaviour.
+    expected = run(PROGRAMS[name], "interpreter", 0).output
+    for backend in BACKENDS:
+        for level in OPTIMIZATION_LEVELS:
+            result = run(PROGRAMS[name], backend, level)
+            assert result.output == expected, (backend, level)
+            if backend == "python" and name not in FALLBACK_PROGRAMS:
+                assert result.fallback is None, (level, result.fallback)
+
+
+def test_fallback_is_recorded():
+    result = run(PROGRAMS["runtime_cases"], "python", 0)
+    assert result.fallback.startswith("ZeroDivisionError")
+    assert run(PROGRAMS["runtime_cases"], "interpreter", 0).fallback is None
+
+
+def test_unexpected_errors_are_not_hidden():
+    with pytest.raises(IndexError):
+        run_code([], "[][0]", backend="python")
+
+
+def test_out_of_range_access_gives_none():
+    output = run(PROGRAMS["out_of_range"], "python", 1).output
+    assert output.splitlines() == ["None", "None", "None", "None", "None", "ell", "llo", "None"]
+
+
+@pytest.mark.parametrize("name", sorted(set(PROGRAMS) - set(FALLBACK_PROGRAMS)))
+def test_emitted_python_runs_on_its_own(name, tmp_path, capsys):
+    path = tmp_path / "program.starr"
+    path.write_text(PROGRAMS[name], encoding="utf-8")
+    expected = run(PROGRAMS[name], "interpreter", 0).output
+    for level in OPTIMIZATION_LEVELS:
+        assert main(["--emit", "python", f"-O{level}", str(path)]) == 0
+        python_code = capsys.readouterr().out
+        output = io.StringIO()
+        with redirect_stdout(output):
+            exec(python_code, {"__builtins__": builtins})
+        assert output.getvalue() == expected, level
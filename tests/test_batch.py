@@ -0,0 +1,42 @@
+import pytest
+
+from phases.batch import compile_files, failures
+
+SOURCES = {
+    "a.starr": 'cout << "a";\n',
+    "b.starr": 'int x = ;\ncout << "b"\nint y = 1;\n',
+    "c.starr": 'int x = 1;\ncout << z;\n',
+    "d.starr": 'array xs = {"d"};\ncout << xs[0];\n',
+}
+
+
+@pytest.fixture
+def paths(tmp_path):
+    paths = []
+    for name, source in SOURCES.items():
+        path = tmp_path / name
+        path.write_text(source, encoding="utf-8")
+        paths.append(str(path))
+    paths.append(str(tmp_path / "missing.starr"))
+    return paths
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_results_keep_input_order_and_diagnostics(paths, jobs):
+    results = compile_files(paths, jobs=jobs, run=True)
+    assert [result.name for result in results] == paths
+    a, b, c, d, missing = results
+    assert a.output == "a\n"
+    assert d.output == "d\n"
+    assert [str(diagnostic) for diagnostic in b.diagnostics] == ["line 1, column 9: Invalid expression",
+                                                                 "line 3, column 1: Expected SEMICOLON"]
+    assert [str(diagnostic) for diagnostic in c.diagnostics] == ["line 2: Semantic Error: Variable 'z' not declared"]
+    assert missing.error.startswith("FileNotFoundError")
+    assert failures(results) == [b, c, missing]
+
+
+def test_results_keep_only_what_is_emitted(paths):
+    result = compile_files(paths[:1], run=True)[0]
+    assert (result.tokens, result.tree, result.intermediate, result.optimized) == (None, None, None, None)
+    result = compile_files(paths[:1], generate=False, emit="ir")[0]
+    assert result.intermediate and result.tokens is None and result.optimized is None
@@ -0,0 +1,18 @@
+from phases.cache import CompilationCache
+
+
+def test_overwriting_an_entry_keeps_the_size_total(tmp_path):
+    cache = CompilationCache(str(tmp_path), max_bytes=10 ** 6)
+    cache.put("cout << 1;", [], "print(1)")
+    size = cache.size
+    for _ in range(5):
+        cache.put("cout << 1;", [], "print(1)")
+    assert cache.size == size == cache.disk_usage()
+
+
+def test_eviction_trims_below_the_limit(tmp_path):
+    cache = CompilationCache(str(tmp_path), max_bytes=2000)
+    for n in range(100):
+        cache.put(f"cout << {n};", [], f"print({n})")
+    assert cache.size <= 2000
+    assert cache.size == cache.disk_usage()
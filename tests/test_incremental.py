@@ -0,0 +1,108 @@
+from phases.incremental import IncrementalCompiler
+from phases.intermediate import IntermediateCode
+from phases.lexical import default_lexer
+from phases.semantic import SemanticAnalysis
+from phases.syntax import SyntaxAnalysis
+
+PROGRAM = '''int a = 1;
+array xs = {"p", "q"};
+int i = 0;
+while (i < size(xs)) {
+    cout << xs[i];
+    i = i + a;
+}
+string s = "x";
+for (x in xs) {
+    s = s + x;
+}
+cout << s;
+cout << a * 2;
+'''
+
+# Each edit replaces the first occurrence of old with new in the previous
+# version of the program.
+EDITS = [
+    ("int a = 1;", "int a = 10;"),
+    ("", "int first = 0;\n"),
+    ("int i = 0;\n", "int i = 0;\nint b = ;\n"),
+    ("cout << a * 2;", "cout << a * 3;"),
+    ("int b = ;\n", "int b = 2;\n"),
+    ("int a = 10;", "string a = \"10\";"),
+    ("string a = \"10\";", "int a = 3;"),
+    ("    s = s + x;\n}\n", "    s = s + x;\n"),
+    ("    s = s + x;\n", "    s = s + x;\n}\n"),
+    ("string s = \"x\";", "string s = \"\";"),
+    ("cout << s;\n", ""),
+    ("cout << a * 3;\n", "cout << a * 3;\ncout << first;\n"),
+]
+
+
+def full_compile(source):
+    tokens = list(default_lexer.tokenize(source))
+    parser = SyntaxAnalysis(tokens)
+    tree = parser.parse_program()
+    result = {"tokens": tokens, "syntax": [str(error) for error in parser.errors]}
+    if parser.errors:
+        return result
+    analyzer = SemanticAnalysis()
+    analyzer.analyze(tree)
+    result["semantic"] = [str(error) for error in analyzer.errors]
+    result["symbols"] = dict(analyzer.symbol_table)
+    if analyzer.errors:
+        return result
+    ic = IntermediateCode()
+    ic.generate(tree)
+    result["code"] = [(str(instruction), instruction.line) for instruction in ic.get_code()]
+    return result
+
+
+def incremental_compile(compiler, source):
+    tokens = compiler.lex(source)
+    compiler.parse()
+    result = {"tokens": list(tokens), "syntax": [str(error) for error in compiler.syntax_errors]}
+    if compiler.syntax_errors:
+        return result
+    compiler.analyze()
+    result["semantic"] = [str(error) for error in compiler.semantic_errors]
+    result["symbols"] = dict(compiler.symbol_table)
+    if compiler.semantic_errors:
+        return result
+    result["code"] = [(str(instruction), instruction.line) for instruction in compiler.generate()]
+    return result
+
+
+def versions():
+    source = PROGRAM
+    yield source
+    for old, new in EDITS:
+        assert old in source
+        source = source.replace(old, new, 1)
+        yield source
+
+
+def test_edits_match_a_full_compile():
+    compiler = IncrementalCompiler()
+    for step, source in enumerate(versions()):
+        assert incremental_compile(compiler, source) == full_compile(source), step
+
+
+def test_unchanged_statements_are_reused():
+    compiler = IncrementalCompiler()
+    incremental_compile(compiler, PROGRAM)
+    assert compiler.stats["reparsed"] == 8
+
+    # Only the edited line's five tokens are lexed again.
+    source = PROGRAM.replace("cout << s;", "cout << s + s;")
+    incremental_compile(compiler, source)
+    assert compiler.stats == {"relexed": 5, "reparsed": 1, "reanalyzed": 1, "regenerated": 1}
+
+    # A new first line moves everything after it, but only it is new.
+    source = "string first = \"\";\n" + source
+    incremental_compile(compiler, source)
+    assert compiler.stats == {"relexed": 5, "reparsed": 1, "reanalyzed": 1, "regenerated": 1}
+
+    # Changing a's type re-analyzes the statements that read it.
+    source = source.replace("int a = 1;", "string a = \"1\";")
+    incremental_compile(compiler, source)
+    assert compiler.stats["reparsed"] == 1
+    assert compiler.stats["reanalyzed"] > 1
@@ -0,0 +1,52 @@
+import inspect
+
+from phases.lexical import Token, default_lexer
+from phases.syntax import SyntaxAnalysis
+
+SOURCE = 'int x = 1;\n  string s = "a b";\n\ncout << s;\n'
+
+
+def test_tokens_carry_line_column_and_offset():
+    assert list(default_lexer.tokenize(SOURCE)) == [
+        Token("KEYWORD", "int", 1, 1, 0),
+        Token("IDENTIFIER", "x", 1, 5, 4),
+        Token("ASSIGN", "=", 1, 7, 6),
+        Token("NUMBER", "1", 1, 9, 8),
+        Token("SEMICOLON", ";", 1, 10, 9),
+        Token("KEYWORD", "string", 2, 3, 13),
+        Token("IDENTIFIER", "s", 2, 10, 20),
+        Token("ASSIGN", "=", 2, 12, 22),
+        Token("STRING_LITERAL", '"a b"', 2, 14, 24),
+        Token("SEMICOLON", ";", 2, 19, 29),
+        Token("COUT", "cout", 4, 1, 32),
+        Token("SHL", "<<", 4, 6, 37),
+        Token("IDENTIFIER", "s", 4, 9, 40),
+        Token("SEMICOLON", ";", 4, 10, 41),
+    ]
+    for token in default_lexer.tokenize(SOURCE):
+        assert SOURCE[token.offset:token.offset + len(token.value)] == token.value
+
+
+def test_lexing_resumes_at_a_line():
+    start = SOURCE.index("cout")
+    assert list(default_lexer.tokenize(SOURCE, start, 4)) == list(default_lexer.tokenize(SOURCE))[10:]
+
+
+def test_parser_pulls_tokens_lazily():
+    pulled = []
+
+    def stream():
+        for token in default_lexer.tokenize(SOURCE):
+            pulled.append(token)
+            yield token
+
+    tokens = stream()
+    assert inspect.isgenerator(default_lexer.tokenize(SOURCE))
+    parser = SyntaxAnalysis(tokens)
+    parser.parse_statement()
+    # Only the first statement's tokens have been read.
+    assert len(pulled) == 5
+    tree = parser.parse_program()
+    assert len(pulled) == 14
+    assert [type(statement).__name__ for statement in tree.statements] == ["Declaration", "Print"]
+    assert not parser.errors
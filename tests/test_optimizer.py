@@ -0,0 +1,245 @@
+import io
+from contextlib import redirect_stdout
+
+from phases.interpreter import Interpreter
+from phases.ir import GOTO, LABEL, PRINT, Const, Instruction
+from phases.optimizer import OPTIMIZATION_LEVELS, Optimizer
+from phases.pipeline import BACKENDS, compile_source
+
+
+def intermediate(source):
+    result = compile_source(source, generate=False, opt_level=0)
+    assert result.ok, result.error
+    return result.intermediate
+
+
+def run_passes(source, *names):
+    # The IR after only the named passes, so each can be checked on code the
+    # rest of the optimizer has not already reduced.
+    optimizer = Optimizer(intermediate(source), level=0)
+    for name in names:
+        optimizer.run_pass(name)
+    return [str(instruction) for instruction in optimizer.code]
+
+
+def optimized(source, level):
+    result = compile_source(source, generate=False, opt_level=level)
+    assert result.ok, result.error
+    return [str(instruction) for instruction in result.optimized]
+
+
+def executed_instructions(source, level):
+    result = compile_source(source, generate=False, opt_level=level)
+    interpreter = Interpreter(result.optimized)
+    interpreter.compile()
+    with redirect_stdout(io.StringIO()):
+        interpreter.run()
+    return interpreter.steps
+
+
+def output(source, level, backend="interpreter"):
+    result = compile_source(source, run=True, backend=backend, opt_level=level)
+    assert result.ok, result.error
+    assert result.fallback is None, result.fallback
+    return result.output
+
+
+def test_constants_fold_through_declarations():
+    source = '''
+int a = 2 * 3 + 4;
+string s = "ab" + "cd";
+int l = length("hello");
+array xs = {"x", "y", "z"};
+int n = size(xs);
+cout << a;
+cout << s;
+cout << l;
+cout << n;
+cout << 3 < 4;
+'''
+    assert optimized(source, 1) == ['print 10', 'print "abcd"', 'print 5', 'print 3', 'print True']
+
+
+def test_reassigned_variables_are_not_propagated():
+    source = '''
+int x = 1;
+int i = 0;
+while (i < 3) {
+    cout << x;
+    x = x + 1;
+    i = i + 1;
+}
+int y = 5;
+cout << y;
+'''
+    code = run_passes(source, "constant_folding")
+    assert 'print x' in code
+    assert 'print 5' in code
+    assert output(source, 1) == output(source, 0) == "1\n2\n3\n5\n"
+
+
+def test_division_by_zero_is_left_to_run_time():
+    source = '''
+int q = 1 / 0;
+cout << q;
+'''
+    assert 'int q = 1 / 0' in run_passes(source, "constant_folding")
+    assert output(source, 1) == output(source, 0) == "0\n"
+
+
+WHILE_LOOP = '''
+array items = {"a", "b"};
+int i = 0;
+while (i < size(items)) {
+    cout << items[i];
+    i = i + 1;
+}
+'''
+
+NESTED_LOOPS = '''
+array words = {"ab", "c"};
+for (w in words) {
+    for (v in words) {
+        cout << w + v;
+    }
+}
+'''
+
+
+def test_jumps_are_threaded_forward():
+    code = [Instruction(GOTO, target="L1"),
+            Instruction(LABEL, target="L0"),
+            Instruction(PRINT, operands=[Const(1)]),
+            Instruction(LABEL, target="L1"),
+            Instruction(GOTO, target="L2"),
+            Instruction(PRINT, operands=[Const(2)]),
+            Instruction(LABEL, target="L2"),
+            Instruction(PRINT, operands=[Const(3)])]
+    optimizer = Optimizer(code, level=0)
+    optimizer.run_pass("jump_threading")
+    assert [str(instruction) for instruction in optimizer.code] == \
+        ['goto L2', 'L0:', 'print 1', 'L1:', 'goto L2', 'print 2', 'L2:', 'print 3']
+
+
+def test_loop_exits_are_not_threaded_back_to_an_outer_loop():
+    code = run_passes(NESTED_LOOPS, "jump_threading")
+    assert code == [str(instruction) for instruction in intermediate(NESTED_LOOPS)]
+
+
+def test_loop_conditions_fall_through_into_the_body():
+    code = run_passes(WHILE_LOOP, "branch_inversion")
+    test = code.index('ifFalse t2 goto L2')
+    assert code[test + 1] == 'L1:'
+    assert 'goto L2' not in code
+
+
+def test_rotated_loops_test_at_the_bottom():
+    code = run_passes(WHILE_LOOP, "branch_inversion", "loop_rotation")
+    assert 'goto L0' not in code
+    assert code.count('t2 = i < t1') == 2
+    assert code[-2:] == ['if t2 goto L3', 'L2:']
+    assert output(NESTED_LOOPS, 2) == output(NESTED_LOOPS, 0)
+    assert executed_instructions(NESTED_LOOPS, 2) < executed_instructions(NESTED_LOOPS, 1)
+
+
+def test_invariant_conditions_are_hoisted():
+    code = run_passes(WHILE_LOOP, "branch_inversion", "loop_invariant_code_motion")
+    assert code.count('t1 = size(items)') == 1
+    assert code.index('t1 = size(items)') < code.index('L0:')
+
+
+def test_code_that_can_raise_stays_in_zero_trip_loops():
+    # Hoisted code runs even when the loop body never does.
+    source = '''
+array items = {"a", "b"};
+int zero = 0;
+int i = 0;
+while (i < zero) {
+    cout << 10 / zero;
+    cout << items[5];
+    cout << size(items) * 2;
+    i = i + 1;
+}
+cout << i;
+'''
+    code = run_passes(source, "branch_inversion", "loop_invariant_code_motion")
+    header = code.index('L0:')
+    assert code.index('t5 = t4 * 2') < header
+    assert code.index('t2 = 10 / zero') > header
+    assert code.index('t3 = items[5]') > header
+    for backend in BACKENDS:
+        for level in OPTIMIZATION_LEVELS:
+            assert output(source, level, backend) == "0\n", (backend, level)
+
+
+def test_iterator_setup_stays_above_the_loop():
+    source = '''
+array words = {"ab", "c"};
+for (w in words) {
+    for (v in words) {
+        int n = length(w) * 2;
+        cout << v;
+        cout << n;
+    }
+}
+'''
+    code = optimized(source, 1)
+    setup = code.index('t2 = iterator(words)')
+    assert code.index('t3 = length(w)') < setup
+    assert code[setup + 1] == 'L3:'
+    code = optimized(source, 2)
+    setup = code.index('t2 = iterator(words)')
+    assert code.index('t3 = length(w)') < setup
+    assert code[setup + 1] == 'ifFalse has_next(t2) goto L5'
+    expected = output(source, 0)
+    for backend in BACKENDS:
+        for level in OPTIMIZATION_LEVELS:
+            assert output(source, level, backend) == expected, (backend, level)
+
+
+VALUE_NUMBERING = '''
+array words = {"ab", "c"};
+for (w in words) {
+    int n = length(w);
+    int m = n + 1;
+    int a = n * m;
+    int b = m * n;
+    n = n + 1;
+    int c = n * m;
+    int d = n + 0;
+    int e = 1 * n;
+    int f = n * 0;
+    int k = 0;
+    while (k < 1) {
+        int p = n * m;
+        cout << p;
+        k = k + 1;
+    }
+    cout << a + b + c + d + e + f;
+}
+'''
+
+
+def test_repeated_expressions_reuse_earlier_results():
+    code = run_passes(VALUE_NUMBERING, "local_value_numbering")
+    assert 'int b = a' in code
+    # n + 1 is still held by m, and n no longer has the value a used.
+    assert 'n = m' in code
+    assert 'int c = n * m' in code
+    assert 'int p = n * m' in code
+
+
+def test_algebraic_identities():
+    code = run_passes(VALUE_NUMBERING, "algebraic_simplification")
+    assert 'int d = n' in code
+    assert 'int e = n' in code
+    assert 'int f = 0' in code
+
+
+def test_global_value_numbering_reuses_across_blocks():
+    code = run_passes(VALUE_NUMBERING, "global_value_numbering")
+    assert 'int p = c' in code
+    expected = output(VALUE_NUMBERING, 0)
+    for backend in BACKENDS:
+        for level in OPTIMIZATION_LEVELS:
+            assert output(VALUE_NUMBERING, level, backend) == expected, (backend, level)
@@ -0,0 +1,21 @@
+from phases.instrument import Instrumentation
+from phases.pipeline import compile_source
+
+SOURCE = '''int x = 1;
+cout << x + 1;
+'''
+
+
+def test_tokens_stream_into_the_parser():
+    result = compile_source(SOURCE, run=True)
+    assert result.output == "2\n"
+    assert result.tokens is None
+
+
+def test_tokens_are_kept_when_asked_for_or_timed():
+    result = compile_source(SOURCE, keep_tokens=True)
+    assert [token.value for token in result.tokens[:3]] == ["int", "x", "="]
+    instrument = Instrumentation(trace_memory=False)
+    result = compile_source(SOURCE, instrument=instrument)
+    assert len(result.tokens) == 11
+    assert instrument.records[0].items["tokens"] == 11
@@ -0,0 +1,68 @@
+import io
+from contextlib import redirect_stdout
+
+from phases.interpreter import Interpreter
+from phases.pipeline import compile_source
+from phases.profiler import Profiler, format_profile
+
+SOURCE = '''int i = 0;
+int total = 0;
+while (i < 3) {
+    total = total + i;
+    i = i + 1;
+}
+cout << total;
+'''
+
+
+def profile_source(source):
+    result = compile_source(source, generate=False, opt_level=0)
+    interpreter = Interpreter(result.optimized)
+    interpreter.compile()
+    profiler = Profiler()
+    output = io.StringIO()
+    with redirect_stdout(output):
+        interpreter.run(profiler)
+    assert output.getvalue() == "3\n"
+    return profiler.as_dict()
+
+
+def test_counts_and_source_lines():
+    profile = profile_source(SOURCE)
+    assert profile["instructions_executed"] == 21
+    rows = sorted(profile["instructions"], key=lambda row: row["index"])
+    assert [(row["index"], row["line"], row["count"], row["instruction"]) for row in rows] == [
+        (1, 1, 1, "int i = 0"),
+        (2, 2, 1, "int total = 0"),
+        (4, 3, 4, "t0 = i < 3"),
+        (5, 3, 4, "if t0 goto L1"),
+        (6, 3, 1, "goto L2"),
+        (8, 4, 3, "total = total + i"),
+        (9, 5, 3, "i = i + 1"),
+        (10, 3, 3, "goto L0"),
+        (12, 7, 1, "print total"),
+    ]
+    assert sorted((line["line"], line["count"]) for line in profile["lines"]) == [
+        (1, 1), (2, 1), (3, 12), (4, 3), (5, 3), (7, 1)]
+    assert profile["total_time"] == sum(row["time"] for row in rows)
+
+
+def test_hot_loop():
+    [loop] = profile_source(SOURCE)["loops"]
+    assert (loop["line"], loop["start"], loop["end"], loop["iterations"]) == (3, 4, 10, 3)
+
+
+def test_format_profile():
+    report = format_profile(profile_source(SOURCE), SOURCE).splitlines()
+    assert report[0].startswith("Executed 21 instructions in ")
+    sections = [report.index(title) for title in ("Hot loops:", "Hot lines:", "Hot instructions:")]
+    assert sections == sorted(sections)
+    loop = report[sections[0] + 2].split()
+    assert loop[:2] == ["3", "3"]
+    assert report[sections[0] + 2].endswith("%  while (i < 3) {")
+    lines = report[sections[1] + 2:sections[2] - 1]
+    assert len(lines) == 6
+    assert any(row.split()[:2] == ["4", "3"] and row.endswith("total = total + i;") for row in lines)
+    instructions = report[sections[2] + 2:]
+    assert len(instructions) == 9
+    assert any(row.split()[:3] == ["8", "4", "3"] and row.endswith("total = total + i") for row in instructions)
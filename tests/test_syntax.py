@@ -0,0 +1,126 @@
+import pytest
+
+from phases.lexical import default_lexer
+from phases.optimizer import OPTIMIZATION_LEVELS
+from phases.pipeline import BACKENDS, compile_source
+from phases.syntax import ArrayAccess, BinaryOp, Identifier, IntLiteral, StringLiteral, SyntaxAnalysis
+
+
+def parse(source):
+    parser = SyntaxAnalysis(default_lexer.tokenize(source))
+    tree = parser.parse_program()
+    return tree, [str(error) for error in parser.errors]
+
+
+def shape(node):
+    # The expression with every binary operation parenthesized.
+    if isinstance(node, BinaryOp):
+        return f"({shape(node.left)} {node.operator} {shape(node.right)})"
+    if isinstance(node, ArrayAccess):
+        return f"{node.name}[{shape(node.index)}]"
+    if isinstance(node, (Identifier, IntLiteral, StringLiteral)):
+        return str(node.name if isinstance(node, Identifier) else node.value)
+    raise TypeError(type(node).__name__)
+
+
+@pytest.mark.parametrize("expression, expected", [
+    ("a - b + c", "((a - b) + c)"),
+    ("a - b - c", "((a - b) - c)"),
+    ("8 / 2 / 2", "((8 / 2) / 2)"),
+    ("a + b * c - d / e", "((a + (b * c)) - (d / e))"),
+    ("(a - b) * c", "((a - b) * c)"),
+    ("a - b < c + 10", "((a - b) < (c + 10))"),
+    ("a * 2 == b + 17", "((a * 2) == (b + 17))"),
+    ("a < b == c < d", "((a < b) == (c < d))"),
+    ("xs[1] + s", "(xs[1] + s)"),
+])
+def test_operator_precedence_and_associativity(expression, expected):
+    tree, errors = parse(f"cout << {expression};")
+    assert not errors
+    assert shape(tree.statements[0].printable) == expected
+    tree, errors = parse(f"int v = {expression};")
+    assert not errors
+    assert shape(tree.statements[0].expression) == expected
+
+
+def test_expressions_evaluate_by_precedence():
+    source = '''
+int a = 10;
+int b = 3;
+int c = 2;
+cout << a - b + c;
+cout << a - b - c;
+cout << a + b * c - 8 / 4;
+cout << 20 / 2 / 5;
+cout << (a - b) * c;
+cout << a - b < c + 10;
+cout << a * 2 == b + 17;
+cout << a < b == c < b;
+string s = "x" + "y";
+cout << s + "z";
+array xs = {"p", "q"};
+cout << xs[1] + s;
+'''
+    expected = "9\n5\n14\n2\n14\nTrue\nTrue\nFalse\nxyz\nqxy\n"
+    for backend in BACKENDS:
+        for level in OPTIMIZATION_LEVELS:
+            result = compile_source(source, run=True, backend=backend, opt_level=level)
+            assert result.output == expected, (backend, level)
+
+
+def test_every_syntax_error_is_reported():
+    source = '''int x = ;
+int y = 2;
+cout << y
+string s = "a";
+while (x < ) {
+    cout << s;
+}
+cout << s;
+'''
+    tree, errors = parse(source)
+    assert errors == ['line 1, column 9: Invalid expression',
+                      'line 4, column 1: Expected SEMICOLON',
+                      'line 5, column 12: Invalid expression']
+    # The statements that parsed are kept.
+    assert [type(statement).__name__ for statement in tree.statements] == ['Declaration', 'Declaration', 'Print']
+
+
+def test_errors_in_a_loop_body_keep_the_loop():
+    source = '''array xs = {"a"};
+for (x in xs) {
+    cout << ;
+    cout << x;
+}
+cout << "end";
+'''
+    tree, errors = parse(source)
+    assert errors == ['line 3, column 13: Invalid expression']
+    assert [type(statement).__name__ for statement in tree.statements] == ['Declaration', 'ForEachLoop', 'Print']
+    assert len(tree.statements[1].body) == 1
+
+
+@pytest.mark.parametrize("source, message", [
+    ('array xs = {', 'Expected RBRACE, found end of input'),
+    ('array xs = {"a",', 'Invalid expression, found end of input'),
+    ('int x = 1 +', 'Invalid expression, found end of input'),
+    ('while (x < 1) {', 'Expected RBRACE, found end of input'),
+])
+def test_end_of_input_is_a_syntax_error(source, message):
+    tree, errors = parse(source)
+    assert errors == [message]
+    result = compile_source(source, generate=False)
+    assert not result.ok
+    assert result.error == f"SyntaxError: {message}"
+
+
+def test_semantic_errors_are_accumulated():
+    source = '''int x = 1;
+int y = z + 1;
+string s = x;
+cout << q;
+'''
+    result = compile_source(source, generate=False)
+    assert result.error.splitlines() == ["Exception: line 2: Semantic Error: Variable 'z' not declared",
+                                         "Exception: line 3: Type Error: Cannot assign int to string",
+                                         "Exception: line 4: Semantic Error: Variable 'q' not declared"]